@@ -1,10 +1,54 @@
-from rest_framework_simplejwt.tokens import AccessToken, BlacklistedToken
+from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework.authentication import BaseAuthentication
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+import time
 
 
 User = get_user_model()
 
+AUTH_USER_CACHE_TIMEOUT = 60
+
+
+def auth_user_key(user_id):
+    return f"auth_user_{user_id}"
+
+
+def blacklisted_jti_key(jti):
+    return f"jwt_blacklist_{jti}"
+
+
+def get_cached_user(user_id):
+    key = auth_user_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = User.objects.get(id=user_id)
+        cache.set(key, user, timeout=AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(auth_user_key(user_id))
+
+
+def blacklist_jti(token):
+    # Keep the entry only as long as the token itself would stay valid.
+    ttl = int(token["exp"] - time.time())
+    if ttl > 0:
+        cache.set(blacklisted_jti_key(token["jti"]), 1, timeout=ttl)
+
+
+def is_jti_blacklisted(jti):
+    return cache.get(blacklisted_jti_key(jti)) is not None
+
+
+def get_user_from_access_token(access_token):
+    token = AccessToken(access_token)
+    if is_jti_blacklisted(token["jti"]):
+        return None, token
+    return get_cached_user(token["user_id"]), token
+
+
 class JWTAuthenticationFromCookies(BaseAuthentication):
     def authenticate(self, request):
         access_token = request.COOKIES.get("access")
@@ -13,10 +57,9 @@ class JWTAuthenticationFromCookies(BaseAuthentication):
             return None  
 
         try:
-            token = AccessToken(access_token)
-            user = User.objects.get(id=token["user_id"])
+            user, token = get_user_from_access_token(access_token)
 
-            if BlacklistedToken.objects.filter(token__jti=token["jti"]).exists():
+            if user is None:
                 return None 
 
         except User.DoesNotExist:
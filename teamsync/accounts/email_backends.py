@@ -0,0 +1,39 @@
+import time
+from django.conf import settings
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+
+
+class SimulatedSMTPBackend(LocmemEmailBackend):
+    """
+    In-memory backend that charges SMTP-like latency, for benchmarking mail throughput offline.
+    Messages land in django.core.mail.outbox; connect/send costs come from
+    EMAIL_SIMULATED_CONNECT_LATENCY and EMAIL_SIMULATED_SEND_LATENCY (seconds).
+    """
+
+    connections_opened = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connect_latency = getattr(settings, "EMAIL_SIMULATED_CONNECT_LATENCY", 0.2)
+        self.send_latency = getattr(settings, "EMAIL_SIMULATED_SEND_LATENCY", 0.02)
+        self.is_open = False
+
+    def open(self):
+        if self.is_open:
+            return False
+        time.sleep(self.connect_latency)
+        SimulatedSMTPBackend.connections_opened += 1
+        self.is_open = True
+        return True
+
+    def close(self):
+        self.is_open = False
+
+    def send_messages(self, messages):
+        new_connection = self.open()
+        try:
+            time.sleep(self.send_latency * len(messages))
+            return super().send_messages(messages)
+        finally:
+            if new_connection:
+                self.close()
@@ -0,0 +1,53 @@
+import json
+import time
+import uuid
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from accounts.outbox import EmailOutbox
+
+
+class Command(BaseCommand):
+    help = "Compare per-message sends with the batched email outbox against a local backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=200)
+        parser.add_argument("--rate", type=float, default=0, help="Outbox rate limit per second (0 = unlimited).")
+        parser.add_argument("--backend", default="accounts.email_backends.SimulatedSMTPBackend")
+
+    def handle(self, *args, **options):
+        count, backend = options["count"], options["backend"]
+
+        started = time.perf_counter()
+        for i in range(count):
+            EmailMessage(f"Benchmark {i}", "body", "bench@example.com", [f"user{i}@example.com"],
+                         connection=get_connection(backend)).send()
+        direct = time.perf_counter() - started
+
+        # A private outbox, so real pending mail is never drained into the benchmark backend
+        # and workers never pick up benchmark mail.
+        outbox = EmailOutbox(prefix=f"email:outbox:benchmark:{uuid.uuid4().hex}")
+        try:
+            # Fill the queue directly so no drain task is scheduled behind our back.
+            outbox.client.rpush(outbox.queue_key, *[
+                json.dumps({
+                    "subject": f"Benchmark {i}", "body": "body", "from_email": "bench@example.com",
+                    "to": [f"user{i}@example.com"], "html": None, "attempts": 0,
+                })
+                for i in range(count)
+            ])
+            stats = outbox.drain(
+                max_messages=count,
+                connection=get_connection(backend),
+                rate_per_second=options["rate"],
+            )
+        finally:
+            outbox.client.delete(outbox.queue_key, outbox.retry_key, outbox.dead_key)
+
+        self.stdout.write(f"per-message: {count} in {direct:.2f}s ({count / direct:.1f} msg/s)")
+        if not stats["seconds"]:
+            self.stdout.write(self.style.WARNING("outbox:      busy (another drain holds the lock)"))
+            return
+        self.stdout.write(
+            f"outbox:      {stats['sent']} in {stats['seconds']:.2f}s "
+            f"({stats['sent'] / stats['seconds']:.1f} msg/s, {stats['failed']} failed)"
+        )
@@ -0,0 +1,239 @@
+import json
+import logging
+import time
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django_redis import get_redis_connection
+from teamsync.locks import RedisLock
+
+logger = logging.getLogger(__name__)
+
+# Plain LPOP/RPUSH/RPOPLPUSH inside Lua, so only Redis 2.6+ is needed (no LPOP count / LMOVE).
+CLAIM_SCRIPT = """
+local claimed = {}
+for i = 1, tonumber(ARGV[1]) do
+    local payload = redis.call('LPOP', KEYS[1])
+    if not payload then break end
+    redis.call('RPUSH', KEYS[2], payload)
+    table.insert(claimed, payload)
+end
+return claimed
+"""
+
+RECOVER_SCRIPT = """
+local moved = 0
+while redis.call('RPOPLPUSH', KEYS[1], KEYS[2]) do
+    moved = moved + 1
+end
+redis.call('SREM', KEYS[3], ARGV[1])
+return moved
+"""
+
+
+class EmailOutbox:
+    """
+    Redis-backed queue of outgoing mail.
+
+    Producers append JSON payloads; a single drainer (guarded by a token lock) sends them over
+    one persistent backend connection per run, paced to rate_per_second. Each batch is moved
+    into the drainer's own processing list and every message is removed from it only once it
+    was sent or rescheduled, so a crashed drainer's mail is put back on the queue by the next
+    drain. Failed sends are retried with exponential backoff from a ZSET and land in a dead
+    list after max_attempts.
+    """
+
+    lock_ttl = 300
+
+    def __init__(self, alias="default", prefix="email:outbox"):
+        self.alias = alias
+        self.prefix = prefix
+        self.queue_key = prefix
+        self.retry_key = f"{prefix}:retry"
+        self.dead_key = f"{prefix}:dead"
+        self.lock_key = f"{prefix}:lock"
+        self.scheduled_key = f"{prefix}:scheduled"
+        self.processing_key = f"{prefix}:processing"
+        self._client = None
+        self._scripts = {}
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_redis_connection(self.alias)
+        return self._client
+
+    def script(self, source):
+        if source not in self._scripts:
+            self._scripts[source] = self.client.register_script(source)
+        return self._scripts[source]
+
+    def processing_list(self, token):
+        return f"{self.processing_key}:{token}"
+
+    def recover(self):
+        """Put mail claimed by drainers that died (or lost the lock) back at the head of the queue."""
+        recovered = 0
+        for token in self.client.smembers(self.processing_key):
+            token = token.decode() if isinstance(token, bytes) else token
+            recovered += self.script(RECOVER_SCRIPT)(
+                keys=[self.processing_list(token), self.queue_key, self.processing_key],
+                args=[token],
+            )
+        if recovered:
+            logger.warning("email outbox recovered %d unacknowledged messages", recovered)
+        return recovered
+
+    def claim(self, token, limit):
+        self.client.sadd(self.processing_key, token)
+        return self.script(CLAIM_SCRIPT)(
+            keys=[self.queue_key, self.processing_list(token)],
+            args=[limit],
+        )
+
+    def ack(self, token, raw, pipe=None):
+        (pipe or self.client).lrem(self.processing_list(token), 1, raw)
+
+    @property
+    def batch_size(self):
+        return getattr(settings, "EMAIL_OUTBOX_BATCH_SIZE", 100)
+
+    @property
+    def rate_per_second(self):
+        return getattr(settings, "EMAIL_OUTBOX_RATE_PER_SECOND", 10)
+
+    @property
+    def max_attempts(self):
+        return getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 5)
+
+    @property
+    def retry_delay(self):
+        return getattr(settings, "EMAIL_OUTBOX_RETRY_DELAY", 30)
+
+    def payload(self, subject, body, to, from_email=None, html=None):
+        return json.dumps({
+            "subject": subject,
+            "body": body,
+            "from_email": from_email or settings.DEFAULT_FROM_EMAIL,
+            "to": list(to),
+            "html": html,
+            "attempts": 0,
+        })
+
+    def enqueue(self, subject, body, to, from_email=None, html=None):
+        self.client.rpush(self.queue_key, self.payload(subject, body, to, from_email, html))
+        self.schedule_drain()
+
+    def enqueue_many(self, messages):
+        """Append many messages (dicts of enqueue() kwargs) with a single RPUSH."""
+        payloads = [self.payload(**message) for message in messages]
+        if payloads:
+            self.client.rpush(self.queue_key, *payloads)
+            self.schedule_drain()
+        return len(payloads)
+
+    def schedule_drain(self, countdown=1):
+        # Coalesce bursts of enqueues into one drain task instead of one task per mail.
+        if self.client.set(self.scheduled_key, 1, nx=True, ex=countdown + 5):
+            from accounts.tasks import drain_email_outbox
+
+            drain_email_outbox.apply_async(countdown=countdown)
+
+    def pending(self):
+        return self.client.llen(self.queue_key) + self.client.zcard(self.retry_key)
+
+    def promote_due_retries(self):
+        due = self.client.zrangebyscore(self.retry_key, "-inf", time.time())
+        for payload in due:
+            if self.client.zrem(self.retry_key, payload):
+                self.client.rpush(self.queue_key, payload)
+        return len(due)
+
+    def build_message(self, payload, connection):
+        message = EmailMultiAlternatives(
+            subject=payload["subject"],
+            body=payload["body"],
+            from_email=payload["from_email"],
+            to=payload["to"],
+            connection=connection,
+        )
+        if payload.get("html"):
+            message.attach_alternative(payload["html"], "text/html")
+        return message
+
+    def fail(self, payload, error, pipe=None):
+        pipe = pipe or self.client
+        payload["attempts"] += 1
+        payload["error"] = str(error)
+        if payload["attempts"] >= self.max_attempts:
+            pipe.rpush(self.dead_key, json.dumps(payload))
+            logger.error("email to %s dropped after %d attempts: %s", payload["to"], payload["attempts"], error)
+            return
+        retry_at = time.time() + self.retry_delay * 2 ** (payload["attempts"] - 1)
+        pipe.zadd(self.retry_key, {json.dumps(payload): retry_at})
+
+    def drain(self, max_messages=None, connection=None, rate_per_second=None):
+        """Send queued mail until the queue is empty or max_messages were attempted; returns stats."""
+        stats = {"sent": 0, "failed": 0, "seconds": 0.0}
+        lock = RedisLock(self.lock_key, self.lock_ttl, client=self.client)
+        if not lock.acquire():
+            return stats
+        token = lock.token
+
+        started = time.perf_counter()
+        rate = self.rate_per_second if rate_per_second is None else rate_per_second
+        interval = 1 / rate if rate else 0
+        next_slot = time.perf_counter()
+        connection = connection or get_connection()
+        try:
+            self.client.delete(self.scheduled_key)
+            self.recover()
+            self.promote_due_retries()
+            while max_messages is None or stats["sent"] + stats["failed"] < max_messages:
+                # Stop claiming mail once the lock is gone; whatever we hold is recovered later.
+                if not lock.renew():
+                    logger.warning("email outbox lost its drain lock; stopping")
+                    break
+
+                limit = self.batch_size
+                if max_messages is not None:
+                    limit = min(limit, max_messages - stats["sent"] - stats["failed"])
+                batch = self.claim(token, limit)
+                if not batch:
+                    break
+
+                for raw in batch:
+                    payload = json.loads(raw)
+                    if interval:
+                        delay = next_slot - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                        next_slot = max(next_slot, time.perf_counter()) + interval
+                    try:
+                        # No-op while the session is up; reconnects after a failure closed it.
+                        connection.open()
+                        connection.send_messages([self.build_message(payload, connection)])
+                        stats["sent"] += 1
+                        self.ack(token, raw)
+                    except Exception as error:
+                        stats["failed"] += 1
+                        pipe = self.client.pipeline()
+                        self.fail(payload, error, pipe)
+                        self.ack(token, raw, pipe)
+                        pipe.execute()
+                        connection.close()
+        finally:
+            connection.close()
+            # Anything left unacknowledged (e.g. an error outside the send) goes back on the queue.
+            self.script(RECOVER_SCRIPT)(
+                keys=[self.processing_list(token), self.queue_key, self.processing_key],
+                args=[token],
+            )
+            lock.release()
+
+        stats["seconds"] = time.perf_counter() - started
+        if stats["sent"] or stats["failed"]:
+            logger.info("email outbox drained: %(sent)d sent, %(failed)d failed in %(seconds).2fs", stats)
+        return stats
+
+
+email_outbox = EmailOutbox()
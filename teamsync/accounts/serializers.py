@@ -12,7 +12,7 @@ from django.core.exceptions import ValidationError
 from rest_framework import serializers
 from accounts.models import Accounts
 from rest_framework import serializers
-from project.models import Project, Issue, Sprint
+from project.models import Project, Issue, Sprint, ProjectStats
 
 redis_client = redis.StrictRedis(host="localhost", port=6379, db=0, decode_responses=True)
 
@@ -189,6 +189,10 @@ class EpicSerializer(serializers.ModelSerializer):
         return IssueSerializer(children, many=True).data
 
     def get_progress(self, obj):
+        stats = self.context.get("stats")
+        if stats is not None:
+            return stats.get_epic_progress(obj.id)
+
         total = obj.children.count()
         completed = obj.children.filter(status="done").count()
         return {
@@ -210,18 +214,23 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
             'issue_counts_by_type', 'issue_counts_by_status', 'epics'
         ]
 
+    def get_stats(self, obj):
+        try:
+            return obj.stats
+        except ProjectStats.DoesNotExist:
+            obj.stats = ProjectStats.rebuild(obj.id)
+            return obj.stats
+
     def get_issue_counts_by_type(self, obj):
-        result = {}
-        for type_key, _ in Issue.ISSUE_TYPES:
-            result[type_key] = obj.issues.filter(type=type_key).count()
-        return result
+        counts = self.get_stats(obj).counts_by_type
+        return {type_key: counts.get(type_key, 0) for type_key, _ in Issue.ISSUE_TYPES}
 
     def get_issue_counts_by_status(self, obj):
-        result = {}
-        for status_key, _ in Issue.STATUS_CHOICES:
-            result[status_key] = obj.issues.filter(status=status_key).count()
-        return result
+        counts = self.get_stats(obj).counts_by_status
+        return {status_key: counts.get(status_key, 0) for status_key, _ in Issue.STATUS_CHOICES}
 
     def get_epics(self, obj):
-        epics = obj.issues.filter(type="epic")
-        return EpicSerializer(epics, many=True).data
+        epics = getattr(obj, "epic_list", None)
+        if epics is None:
+            epics = obj.issues.filter(type="epic").prefetch_related("children")
+        return EpicSerializer(epics, many=True, context={"stats": self.get_stats(obj)}).data
@@ -1,18 +1,22 @@
 from django.core.mail import EmailMultiAlternatives
-from realtime.models import Notification, Meeting  
-from channels.layers import get_channel_layer
+from realtime.models import Meeting
+from realtime.notifications import notify
+from accounts.outbox import email_outbox
 from django.utils.html import format_html
-from django.core.mail import send_mail
-from asgiref.sync import async_to_sync
+from django.core.mail import get_connection
 from django.conf import settings
 from django.core import signing
 from celery import shared_task
 import hashlib
+import logging
 import random
+import time
 import redis
 
 
 
+logger = logging.getLogger(__name__)
+
 redis_client = redis.StrictRedis(host="localhost", port=6379, db=0, decode_responses=True)
 
 @shared_task
@@ -26,15 +30,14 @@ def send_otp_email(user_id, email):
 
     subject = "Your OTP for Team Sync"
     message = f"Your OTP code is: {otp}. It is valid for 2 minutes."
-    send_mail(subject, message, "noreply@teamsync.com", [email])
+    email_outbox.enqueue(subject, message, [email], from_email="noreply@teamsync.com")
 
-    return f"OTP {otp} sent to {email}"
+    return f"OTP {otp} queued for {email}"
 
 
 
 
-@shared_task
-def send_invitation_email(email, full_name, role, workspace_name, token):
+def invitation_email(email, full_name, role, workspace_name, token):
     invite_link = f"{settings.FRONTEND_URL}/join-workspace/{token}"
 
     print("invite link",invite_link)
@@ -59,14 +62,33 @@ def send_invitation_email(email, full_name, role, workspace_name, token):
         full_name, workspace_name, role, invite_link
     )
 
-    email_obj = EmailMultiAlternatives(
-        subject="Workspace Invitation",
-        body=f"Hello {full_name},\n\nYou have been invited to join '{workspace_name}' as a {role}.\nClick the link to accept: {invite_link}",
-        from_email="no-reply@yourapp.com",
-        to=[email],
-    )
-    email_obj.attach_alternative(html_content, "text/html")
-    email_obj.send()
+    return {
+        "subject": "Workspace Invitation",
+        "body": f"Hello {full_name},\n\nYou have been invited to join '{workspace_name}' as a {role}.\nClick the link to accept: {invite_link}",
+        "from_email": "no-reply@yourapp.com",
+        "to": [email],
+        "html": str(html_content),
+    }
+
+
+@shared_task
+def send_invitation_email(email, full_name, role, workspace_name, token):
+    email_outbox.enqueue(**invitation_email(email, full_name, role, workspace_name, token))
+
+
+INVITATION_CHUNK_SIZE = 100
+
+
+@shared_task
+def send_invitation_emails(workspace_name, invites):
+    """Queue a whole invite batch; invites are [email, full_name, role, token] rows."""
+    queued = 0
+    for i in range(0, len(invites), INVITATION_CHUNK_SIZE):
+        queued += email_outbox.enqueue_many([
+            invitation_email(email, full_name, role, workspace_name, token)
+            for email, full_name, role, token in invites[i:i + INVITATION_CHUNK_SIZE]
+        ])
+    return queued
 
 
 @shared_task
@@ -76,7 +98,12 @@ def send_password_reset_email(email, reset_link):
     from_email = settings.DEFAULT_FROM_EMAIL
     recipient_list = [email]
 
-    send_mail(subject, message, from_email, recipient_list)
+    email_outbox.enqueue(subject, message, recipient_list, from_email=from_email)
+
+
+@shared_task
+def drain_email_outbox():
+    return email_outbox.drain()
 
 
 def generate_meeting_token(user_id, room_id):
@@ -84,70 +111,92 @@ def generate_meeting_token(user_id, room_id):
     return signing.dumps(value)
 
 
+MEETING_EMAIL_CHUNK_SIZE = 50
+
+
 @shared_task
 def send_meeting_notification(meeting_id):
+    timings = {}
+    started = time.perf_counter()
     try:
         meeting = Meeting.objects.select_related('workspace').get(id=meeting_id)
-        message = f"Meeting scheduled in Workspace '{meeting.workspace.name}' is starting soon! Check your email to join."
-
-        for participant in meeting.participants.all():
-            token = generate_meeting_token(participant.id, str(meeting.room_id))
-            join_url = (
-                f"{settings.FRONTEND_URL}/dashboard/join-meeting"
-                f"?roomID={meeting.room_id}&userID={participant.id}"
-                f"&userName={participant.first_name}&token={token}"
-            )
-
-            notification = Notification.objects.create(
-                recipient=participant,
-                workspace=meeting.workspace,
-                message=message
-            )
-
-            group_name = f"workspace_{meeting.workspace.id}_user_{participant.id}"
-            channel_layer = get_channel_layer()
-            async_to_sync(channel_layer.group_send)(
-                group_name,
-                {
-                    "type": "send_notification",
-                    "content": {
-                        "message": notification.message,
-                        "workspace": {
-                            "id": meeting.workspace.id,
-                            "name": meeting.workspace.name,
-                        },
-                    }
-                }
-            )
-
-            subject = "You're Invited: Upcoming Meeting"
-            html_message = f"""
-                <p>Hi {participant.first_name},</p>
-                <p>You have a meeting scheduled in <strong>{meeting.workspace.name}</strong>.</p>
-                <p>
-                    <a href="{join_url}"
-                    style="display: inline-block; padding: 10px 20px; background-color: #4F46E5;
-                            color: white; text-decoration: none; border-radius: 5px; font-weight: bold;">
-                        Join Meeting
-                    </a>
-                </p>
-                <p>See you there!</p>
-            """
-
-
-            send_mail(
-                subject,
-                "",  
-                settings.DEFAULT_FROM_EMAIL,
-                [participant.email],
-                html_message=html_message,
-            )
-            print("join url",join_url)
-
     except Meeting.DoesNotExist:
-        pass
+        return None
+
+    message = f"Meeting scheduled in Workspace '{meeting.workspace.name}' is starting soon! Check your email to join."
+    participants = list(meeting.participants.values_list('id', flat=True))
+    timings['load'] = time.perf_counter() - started
+
+    phase = time.perf_counter()
+    notify([(participant_id, meeting.workspace, message) for participant_id in participants])
+    timings['notifications'] = time.perf_counter() - phase
+
+    # Large meetings fan the mail out across workers; small ones send right here.
+    chunk_size = getattr(settings, 'MEETING_EMAIL_CHUNK_SIZE', MEETING_EMAIL_CHUNK_SIZE)
+    chunks = [participants[i:i + chunk_size] for i in range(0, len(participants), chunk_size)]
+
+    phase = time.perf_counter()
+    if len(chunks) > 1:
+        for chunk in chunks:
+            send_meeting_emails.delay(meeting_id, chunk)
+        timings['emails_queued'] = time.perf_counter() - phase
+    elif chunks:
+        send_meeting_emails(meeting_id, chunks[0])
+        timings['emails'] = time.perf_counter() - phase
+
+    timings['total'] = time.perf_counter() - started
+    logger.info(
+        "meeting %s reminder: %d participants, %d chunk(s), %s",
+        meeting_id, len(participants), len(chunks),
+        ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in timings.items()),
+    )
+    return timings
 
 
+@shared_task
+def send_meeting_emails(meeting_id, participant_ids):
+    """Send one chunk of meeting reminders over a single SMTP connection."""
+    timings = {}
+    started = time.perf_counter()
+    meeting = Meeting.objects.select_related('workspace').filter(id=meeting_id).first()
+    if meeting is None:
+        return None
+
+    participants = meeting.participants.filter(id__in=participant_ids)
+    subject = "You're Invited: Upcoming Meeting"
+
+    messages = []
+    for participant in participants:
+        token = generate_meeting_token(participant.id, str(meeting.room_id))
+        join_url = (
+            f"{settings.FRONTEND_URL}/dashboard/join-meeting"
+            f"?roomID={meeting.room_id}&userID={participant.id}"
+            f"&userName={participant.first_name}&token={token}"
+        )
+        html_message = f"""
+            <p>Hi {participant.first_name},</p>
+            <p>You have a meeting scheduled in <strong>{meeting.workspace.name}</strong>.</p>
+            <p>
+                <a href="{join_url}"
+                style="display: inline-block; padding: 10px 20px; background-color: #4F46E5;
+                        color: white; text-decoration: none; border-radius: 5px; font-weight: bold;">
+                    Join Meeting
+                </a>
+            </p>
+            <p>See you there!</p>
+        """
 
+        email = EmailMultiAlternatives(subject, "", settings.DEFAULT_FROM_EMAIL, [participant.email])
+        email.attach_alternative(html_message, "text/html")
+        messages.append(email)
+    timings['render'] = time.perf_counter() - started
 
+    phase = time.perf_counter()
+    sent = get_connection().send_messages(messages) or 0
+    timings['smtp'] = time.perf_counter() - phase
 
+    logger.info(
+        "meeting %s emails: %d/%d sent, render=%.1fms, smtp=%.1fms",
+        meeting_id, sent, len(messages), timings['render'] * 1000, timings['smtp'] * 1000,
+    )
+    return sent
@@ -14,11 +14,13 @@ from django.utils.encoding import force_bytes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.utils.timezone import now
-from project.models import Project
+from project.models import Project, Issue
+from django.db.models import Prefetch
 from rest_framework import status
 from django.conf import settings
 from datetime import timedelta
 from .models import Accounts
+from .authentication import blacklist_jti
 import requests
 
 
@@ -208,10 +210,14 @@ class LogoutView(APIView):
     def post(self, request):
         refresh_token = request.data.get("refresh")
 
+        if request.auth is not None:
+            blacklist_jti(request.auth)
+
         if refresh_token:
             try:
                 token = RefreshToken(refresh_token)
                 token.blacklist()
+                blacklist_jti(token)
             except ExpiredTokenError:
                 print("Token already expired — skipping blacklist.")
             except SimpleJWTTokenError as e:
@@ -333,7 +339,13 @@ class ResetPasswordView(APIView):
 
 
 class ProjectDetailView(RetrieveAPIView):
-    queryset = Project.objects.all()
+    queryset = Project.objects.select_related("stats").prefetch_related(
+        Prefetch(
+            "issues",
+            queryset=Issue.objects.filter(type="epic").prefetch_related("children"),
+            to_attr="epic_list",
+        )
+    )
     serializer_class = ProjectDetailSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = 'id' 
\ No newline at end of file
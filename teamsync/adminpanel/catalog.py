@@ -0,0 +1,91 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+
+class PlanCatalog:
+    """
+    The serialized plan list, cached in-process and in Redis under a version number.
+
+    invalidate() bumps the shared version; every process notices within
+    PLAN_CATALOG_LOCAL_TTL seconds and reloads the list from Redis (or the database
+    if this version has not been built yet).
+    """
+
+    version_key = "plans:catalog:version"
+
+    def __init__(self):
+        self.local = None
+
+    @property
+    def local_ttl(self):
+        return getattr(settings, "PLAN_CATALOG_LOCAL_TTL", 5)
+
+    @property
+    def cache_ttl(self):
+        return getattr(settings, "PLAN_CATALOG_CACHE_TTL", 60 * 60 * 24)
+
+    def version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            # Start from the clock so a lost version key never brings back an old catalog.
+            cache.add(self.version_key, time.time_ns(), timeout=None)
+            version = cache.get(self.version_key)
+        return version
+
+    def invalidate(self):
+        self.local = None
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.add(self.version_key, time.time_ns(), timeout=None)
+
+    def build(self):
+        from .models import Plan
+        from .serializers import PlanSerializer
+
+        plans = Plan.objects.exclude(stripe_sync_status__in=Plan.DELETED_STATUSES).order_by("id")
+        return [dict(plan) for plan in PlanSerializer(plans, many=True).data]
+
+    def load(self):
+        local = self.local
+        if local and local["checked_at"] + self.local_ttl > time.monotonic():
+            return local
+
+        version = self.version()
+        if local and local["version"] == version:
+            local["checked_at"] = time.monotonic()
+            return local
+
+        key = f"plans:catalog:{version}"
+        plans = cache.get(key)
+        if plans is None:
+            plans = self.build()
+            cache.set(key, plans, self.cache_ttl)
+
+        self.local = {
+            "version": version,
+            "checked_at": time.monotonic(),
+            "plans": plans,
+            "by_id": {plan["id"]: plan for plan in plans},
+        }
+        return self.local
+
+    def plans(self):
+        return self.load()["plans"]
+
+    def get(self, plan_id):
+        try:
+            return self.load()["by_id"].get(int(plan_id))
+        except (TypeError, ValueError):
+            return None
+
+    def get_purchasable(self, plan_id):
+        """An active plan whose Stripe price exists; None otherwise."""
+        plan = self.get(plan_id)
+        if plan and plan["is_active"] and plan["stripe_price_id"]:
+            return plan
+        return None
+
+
+plan_catalog = PlanCatalog()
@@ -0,0 +1,25 @@
+import stripe
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from adminpanel.models import Payment
+
+
+class Command(BaseCommand):
+    help = "Fill the local payments ledger from paid Stripe invoices."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", type=int, help="Only invoices created at or after this Unix timestamp.")
+
+    def handle(self, *args, **options):
+        stripe.api_key = settings.STRIPE_SECRET_KEY
+
+        params = {"status": "paid", "limit": 100}
+        if options["since"]:
+            params["created"] = {"gte": options["since"]}
+
+        count = 0
+        for invoice in stripe.Invoice.list(**params).auto_paging_iter():
+            Payment.record_invoice(invoice)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Recorded {count} paid invoices."))
@@ -1,17 +1,89 @@
+from datetime import datetime, timezone
 from django.db import models
+from django.utils.timezone import now
 
 # Create your models here.
 
 
 
 class Plan(models.Model):
+    # Soft-deleted plans wait in the Stripe outbox until their product and prices are archived.
+    DELETED_STATUSES = ["pending_delete", "delete_failed"]
+
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)  
-    stripe_product_id = models.CharField(max_length=100, unique=True) 
-    stripe_price_id = models.CharField(max_length=100, unique=True) 
+    stripe_product_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    stripe_price_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
     duration_days = models.IntegerField(default=30)
     is_active = models.BooleanField(default=True)
 
+    # Stripe product/price are created by adminpanel.tasks.sync_plan_to_stripe after the row is saved.
+    stripe_sync_status = models.CharField(max_length=20, default="pending")
+    stripe_sync_attempts = models.PositiveIntegerField(default=0)
+    stripe_sync_error = models.TextField(blank=True, default="")
+    stripe_sync_next_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    def is_sync_due(self):
+        return self.stripe_sync_next_attempt_at is None or self.stripe_sync_next_attempt_at <= now()
+
+    def unit_amount_cents(self):
+        return int(round(self.price * 100))
+
+    def stripe_recurring(self):
+        if self.duration_days < 365:
+            return {"interval": "month", "interval_count": max(1, self.duration_days // 30)}
+        return {"interval": "year", "interval_count": min(3, self.duration_days // 365)}
+
     def __str__(self):
         return self.name
+
+
+class Payment(models.Model):
+    """Local ledger of paid Stripe invoices, filled by webhooks and the backfill_payments command."""
+    stripe_invoice_id = models.CharField(max_length=100, unique=True)
+    stripe_subscription_id = models.CharField(max_length=255, null=True, blank=True)
+    stripe_customer_id = models.CharField(max_length=255, null=True, blank=True)
+    plan = models.ForeignKey(Plan, on_delete=models.SET_NULL, null=True, blank=True, related_name="payments")
+    workspace = models.ForeignKey("workspace.Workspace", on_delete=models.SET_NULL, null=True, blank=True, related_name="payments")
+    amount_cents = models.PositiveIntegerField(default=0)
+    currency = models.CharField(max_length=10, default="usd")
+    status = models.CharField(max_length=32)
+    paid_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["plan", "status", "paid_at"]),
+        ]
+
+    @staticmethod
+    def invoice_price_id(invoice):
+        lines = (invoice.get("lines") or {}).get("data") or []
+        for line in lines:
+            price = line.get("price") or {}
+            if price.get("id"):
+                return price["id"]
+        return None
+
+    @classmethod
+    def record_invoice(cls, invoice):
+        from workspace.models import Workspace
+
+        paid_at = (invoice.get("status_transitions") or {}).get("paid_at") or invoice.get("created")
+        price_id = cls.invoice_price_id(invoice)
+        subscription_id = invoice.get("subscription")
+
+        payment, _ = cls.objects.update_or_create(
+            stripe_invoice_id=invoice["id"],
+            defaults={
+                "stripe_subscription_id": subscription_id,
+                "stripe_customer_id": invoice.get("customer"),
+                "plan": Plan.objects.filter(stripe_price_id=price_id).first() if price_id else None,
+                "workspace": Workspace.objects.filter(stripe_subscription_id=subscription_id).first() if subscription_id else None,
+                "amount_cents": invoice.get("amount_paid") or 0,
+                "currency": invoice.get("currency") or "usd",
+                "status": invoice.get("status") or "",
+                "paid_at": datetime.fromtimestamp(paid_at, tz=timezone.utc) if paid_at else None,
+            },
+        )
+        return payment
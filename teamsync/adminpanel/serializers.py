@@ -1,14 +1,14 @@
 from rest_framework import serializers
 from .models import Plan
 from workspace.models import Workspace
-import stripe
-from django.conf import settings
-
-stripe.api_key = settings.STRIPE_SECRET_KEY 
 
 class PlanSerializer(serializers.ModelSerializer):
     stripe_product_id = serializers.CharField(read_only=True)
     stripe_price_id = serializers.CharField(read_only=True)
+    stripe_sync_status = serializers.CharField(read_only=True)
+    stripe_sync_attempts = serializers.IntegerField(read_only=True)
+    stripe_sync_error = serializers.CharField(read_only=True)
+    stripe_sync_next_attempt_at = serializers.DateTimeField(read_only=True)
 
     class Meta:
         model = Plan
@@ -17,7 +17,7 @@ class PlanSerializer(serializers.ModelSerializer):
 
 class WorkspaceSerializer(serializers.ModelSerializer):
     plan_name = serializers.SerializerMethodField()
-    member_count = serializers.SerializerMethodField()
+    member_count = serializers.IntegerField(read_only=True)
     subscription_status = serializers.SerializerMethodField()
     formatted_plan_expiry = serializers.SerializerMethodField()
 
@@ -32,20 +32,10 @@ class WorkspaceSerializer(serializers.ModelSerializer):
     def get_plan_name(self, obj):
         return obj.plan.name if obj.plan else "No Plan"
 
-    def get_member_count(self, obj):
-        return obj.members.count()
-
     def get_subscription_status(self, obj):
         if not obj.stripe_subscription_id:
             return "no_subscription"
-        try:
-            stripe.api_key = settings.STRIPE_SECRET_KEY
-            subscription = stripe.Subscription.retrieve(obj.stripe_subscription_id)
-            return subscription.status
-        except stripe.error.InvalidRequestError:
-            return "invalid_subscription"
-        except Exception:
-            return "error"
+        return obj.subscription_status
 
     def get_formatted_plan_expiry(self, obj):
         if obj.plan_expiry:
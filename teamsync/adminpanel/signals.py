@@ -0,0 +1,11 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .catalog import plan_catalog
+from .models import Plan
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+def invalidate_plan_catalog(sender, instance, **kwargs):
+    transaction.on_commit(plan_catalog.invalidate)
@@ -0,0 +1,174 @@
+import logging
+from datetime import timedelta
+import stripe
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+from .catalog import plan_catalog
+from .models import Plan
+from teamsync.locks import RedisLock
+from workspace.stripe_cache import stripe_cache
+
+logger = logging.getLogger(__name__)
+
+SYNC_FIELDS = [
+    "stripe_product_id", "stripe_price_id",
+    "stripe_sync_status", "stripe_sync_attempts", "stripe_sync_error", "stripe_sync_next_attempt_at",
+]
+
+
+def queue_plan_sync(plan_id):
+    """Hand a saved plan to the Stripe outbox once the surrounding transaction commits."""
+
+    def enqueue():
+        from .tasks import sync_plan_to_stripe
+
+        try:
+            sync_plan_to_stripe.delay(plan_id)
+        except Exception:
+            # The plan stays pending; the sweep_plan_sync beat task retries it.
+            logger.exception("could not queue stripe sync for plan %s", plan_id)
+
+    transaction.on_commit(enqueue)
+
+
+def queue_plan_delete(plan):
+    """Soft-delete a plan; the outbox archives its Stripe product and prices, then removes the row."""
+    plan.is_active = False
+    plan.stripe_sync_status = "pending_delete"
+    plan.stripe_sync_attempts = 0
+    plan.stripe_sync_error = ""
+    plan.stripe_sync_next_attempt_at = None
+    plan.save(update_fields=["is_active", "stripe_sync_status", "stripe_sync_attempts", "stripe_sync_error", "stripe_sync_next_attempt_at"])
+    queue_plan_sync(plan.id)
+
+
+def plan_price_matches(plan, price):
+    recurring = price.get("recurring") or {}
+    wanted = plan.stripe_recurring()
+    return (
+        price.get("unit_amount") == plan.unit_amount_cents()
+        and price.get("active", True)
+        and recurring.get("interval") == wanted["interval"]
+        and recurring.get("interval_count") == wanted["interval_count"]
+    )
+
+
+def push_plan(plan):
+    """Create or update the plan's Stripe product, and create a new price if the current one no longer matches."""
+    if plan.stripe_product_id:
+        stripe.Product.modify(plan.stripe_product_id, name=plan.name, description=plan.description or "")
+    else:
+        product = stripe.Product.create(
+            name=plan.name,
+            description=plan.description or "",
+            idempotency_key=f"plan-{plan.id}-product",
+        )
+        plan.stripe_product_id = product["id"]
+
+    if plan.stripe_price_id and plan_price_matches(plan, stripe_cache.get_price(plan.stripe_price_id)):
+        return
+
+    recurring = plan.stripe_recurring()
+    price = stripe.Price.create(
+        unit_amount=plan.unit_amount_cents(),
+        currency="usd",
+        recurring=recurring,
+        product=plan.stripe_product_id,
+        idempotency_key=f"plan-{plan.id}-price-{plan.unit_amount_cents()}-{recurring['interval']}-{recurring['interval_count']}",
+    )
+    # Within Stripe's 24h idempotency window an A -> B -> A edit replays the first create and
+    # hands back price A as it was then, although it has since been archived; make sure the
+    # price the plan is about to point at is live.
+    stripe.Price.modify(price["id"], active=True)
+    # Existing subscriptions keep the old price; archiving only stops new checkouts on it.
+    if plan.stripe_price_id and plan.stripe_price_id != price["id"]:
+        stripe.Price.modify(plan.stripe_price_id, active=False)
+    plan.stripe_price_id = price["id"]
+
+
+def archive_plan(plan):
+    """Archive every active price of the plan's product, then the product itself."""
+    if plan.stripe_product_id:
+        for price in stripe.Price.list(product=plan.stripe_product_id, active=True).auto_paging_iter():
+            stripe.Price.modify(price["id"], active=False)
+        stripe.Product.modify(plan.stripe_product_id, active=False)
+    elif plan.stripe_price_id:
+        stripe.Price.modify(plan.stripe_price_id, active=False)
+
+
+def record_failure(plan, error, failed_status):
+    plan.stripe_sync_attempts += 1
+    plan.stripe_sync_error = str(error)
+    if plan.stripe_sync_attempts >= getattr(settings, "PLAN_STRIPE_SYNC_MAX_ATTEMPTS", 5):
+        plan.stripe_sync_status = failed_status
+        plan.stripe_sync_next_attempt_at = None
+    else:
+        retry_delay = getattr(settings, "PLAN_STRIPE_SYNC_RETRY_DELAY", 30)
+        plan.stripe_sync_next_attempt_at = now() + timedelta(seconds=retry_delay * 2 ** (plan.stripe_sync_attempts - 1))
+    logger.warning("stripe sync for plan %s failed (attempt %d): %s", plan.id, plan.stripe_sync_attempts, error)
+
+
+def sync_plan(plan_id):
+    """
+    Run one outbox entry; returns the plan's sync status afterwards, "locked" if another worker
+    holds the plan, or "not_due" while a failed attempt is backing off.
+    """
+    lock = RedisLock(f"plans:stripe-sync:{plan_id}:lock", ttl=120)
+    if not lock.acquire():
+        return "locked"
+
+    try:
+        plan = Plan.objects.filter(id=plan_id).first()
+        if plan is None:
+            return None
+        if plan.stripe_sync_status in ("pending", "pending_delete") and not plan.is_sync_due():
+            return "not_due"
+        if plan.stripe_sync_status == "pending_delete":
+            return delete_plan(plan)
+        if plan.stripe_sync_status != "pending":
+            return plan.stripe_sync_status
+
+        try:
+            push_plan(plan)
+        except stripe.error.StripeError as error:
+            record_failure(plan, error, "failed")
+        else:
+            plan.stripe_sync_status = "synced"
+            plan.stripe_sync_attempts = 0
+            plan.stripe_sync_error = ""
+            plan.stripe_sync_next_attempt_at = None
+
+        # One conditional UPDATE: if an admin edit landed while Stripe was being called, the
+        # snapshot no longer matches, so the edit's "pending" survives for the next run.
+        fields = {name: getattr(plan, name) for name in SYNC_FIELDS}
+        updated = Plan.objects.filter(
+            id=plan.id,
+            stripe_sync_status="pending",
+            name=plan.name,
+            description=plan.description,
+            price=plan.price,
+            duration_days=plan.duration_days,
+        ).update(**fields)
+        if not updated:
+            for name in ("stripe_sync_status", "stripe_sync_attempts", "stripe_sync_next_attempt_at"):
+                fields.pop(name)
+            Plan.objects.filter(id=plan.id).update(**fields)
+            plan.stripe_sync_status = "pending"
+        transaction.on_commit(plan_catalog.invalidate)
+        return plan.stripe_sync_status
+    finally:
+        lock.release()
+
+
+def delete_plan(plan):
+    try:
+        archive_plan(plan)
+    except stripe.error.StripeError as error:
+        # After the last attempt the plan is kept (inactive) so the live Stripe product can be found.
+        record_failure(plan, error, "delete_failed")
+        plan.save(update_fields=SYNC_FIELDS[2:])
+        return plan.stripe_sync_status
+
+    plan.delete()
+    return "deleted"
@@ -0,0 +1,36 @@
+from celery import shared_task
+from django.db.models import Q
+from django.utils.timezone import now
+from .models import Plan
+from .stripe_sync import sync_plan
+
+
+@shared_task
+def sync_plan_to_stripe(plan_id):
+    """Push (or archive) a plan's product and prices in Stripe."""
+    status = sync_plan(plan_id)
+    if status not in ("pending", "pending_delete"):
+        # "locked" / "not_due": the holder or the retry already scheduled will handle it.
+        return status
+
+    # Still pending after this run: a failure backing off, or an edit saved mid-sync.
+    plan = Plan.objects.filter(id=plan_id).first()
+    if plan is not None:
+        countdown = 1
+        if plan.stripe_sync_next_attempt_at:
+            countdown = max(1, (plan.stripe_sync_next_attempt_at - now()).total_seconds())
+        sync_plan_to_stripe.apply_async((plan_id,), countdown=countdown)
+    return status
+
+
+@shared_task
+def sweep_plan_sync():
+    """Re-queue due plans whose sync was never picked up (e.g. broker outage)."""
+    plan_ids = list(
+        Plan.objects.filter(stripe_sync_status__in=["pending", "pending_delete"])
+        .filter(Q(stripe_sync_next_attempt_at__isnull=True) | Q(stripe_sync_next_attempt_at__lte=now()))
+        .values_list("id", flat=True)
+    )
+    for plan_id in plan_ids:
+        sync_plan_to_stripe.delay(plan_id)
+    return len(plan_ids)
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from accounts.models import Accounts
 from workspace.models import Workspace
@@ -71,8 +71,14 @@ class Issue(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=["sprint", "is_completed", "type"]),
+            models.Index(fields=["project", "updated_at", "id"]),
         ]
 
+    def save(self, *args, **kwargs):
+        # project.signals locks the stored row in pre_save; hold it until the stats delta lands.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.type.upper()}: {self.title}"
 
@@ -128,3 +134,75 @@ class Sprint(models.Model):
 
     def __str__(self):
         return f"{self.name}"
+
+
+class ProjectStats(models.Model):
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name="stats")
+    counts_by_type = models.JSONField(default=dict)
+    counts_by_status = models.JSONField(default=dict)
+    epic_progress = models.JSONField(default=dict)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls, project_id):
+        # Deltas wait on this lock, so none is applied to counts that are being recomputed.
+        cls.objects.select_for_update().filter(project_id=project_id).first()
+        issues = Issue.objects.filter(project_id=project_id)
+
+        counts_by_type = {
+            row["type"]: row["total"]
+            for row in issues.values("type").annotate(total=models.Count("id"))
+        }
+        counts_by_status = {
+            row["status"]: row["total"]
+            for row in issues.values("status").annotate(total=models.Count("id"))
+        }
+        epic_progress = {
+            str(row["parent_id"]): {"total": row["total"], "completed": row["completed"]}
+            for row in issues.filter(parent__isnull=False).values("parent_id").annotate(
+                total=models.Count("id"),
+                completed=models.Count("id", filter=models.Q(status="done")),
+            )
+        }
+
+        stats, _ = cls.objects.update_or_create(
+            project_id=project_id,
+            defaults={
+                "counts_by_type": counts_by_type,
+                "counts_by_status": counts_by_status,
+                "epic_progress": epic_progress,
+            },
+        )
+        return stats
+
+    def apply(self, state, delta):
+        issue_type, issue_status, parent_id = state
+
+        self.counts_by_type[issue_type] = self.counts_by_type.get(issue_type, 0) + delta
+        self.counts_by_status[issue_status] = self.counts_by_status.get(issue_status, 0) + delta
+
+        if parent_id:
+            key = str(parent_id)
+            progress = self.epic_progress.get(key, {"total": 0, "completed": 0})
+            progress["total"] += delta
+            if issue_status == "done":
+                progress["completed"] += delta
+
+            if progress["total"] > 0:
+                self.epic_progress[key] = progress
+            else:
+                self.epic_progress.pop(key, None)
+
+    def get_epic_progress(self, epic_id):
+        progress = self.epic_progress.get(str(epic_id), {"total": 0, "completed": 0})
+        total, completed = progress["total"], progress["completed"]
+        return {
+            "total": total,
+            "completed": completed,
+            "percentage": int((completed / total) * 100) if total > 0 else 0
+        }
+
+    def __str__(self):
+        return f"Stats for {self.project_id}"
@@ -0,0 +1,67 @@
+import base64
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class IssueKeysetPagination(BasePagination):
+    """Keyset pagination over (updated_at, id); the cursor is the last row's key."""
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    page_size = 50
+    max_page_size = 200
+    ordering = ("updated_at", "id")
+
+    def is_requested(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or self.page_size_query_param in request.query_params
+        )
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, issue):
+        raw = f"{issue.updated_at.isoformat()}|{issue.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+            updated_at, issue_id = raw.rsplit("|", 1)
+            updated_at = parse_datetime(updated_at)
+            if updated_at is None:
+                raise ValueError
+            return updated_at, int(issue_id)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound("Invalid cursor")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size_value = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            updated_at, issue_id = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=issue_id)
+            )
+
+        rows = list(queryset[:self.page_size_value + 1])
+        self.has_more = len(rows) > self.page_size_value
+        page = rows[:self.page_size_value]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_more else None
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            "results": data,
+            "next_cursor": self.next_cursor,
+            "has_more": self.has_more,
+        })
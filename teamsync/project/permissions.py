@@ -1,8 +1,83 @@
+from django.core.cache import cache
 from rest_framework.permissions import BasePermission
 from workspace.models import WorkspaceMember, CustomRole
 
 
 
+DEFAULT_ROLE_PERMISSIONS = {
+    "owner": frozenset(["*"]),
+    "manager": frozenset(["create_project","create_epic", "start_sprint","update_status"]),
+    "developer": frozenset(["update_status"]),
+    "designer": frozenset(["update_status"]),
+}
+
+PERMISSION_CACHE_TIMEOUT = 300
+NOT_A_MEMBER = (None, None)
+
+
+def permission_cache_key(workspace_id, user_id):
+    return f"workspace_{workspace_id}_user_{user_id}_permissions"
+
+
+def compile_permissions(workspace_id, user_id):
+    try:
+        role = WorkspaceMember.objects.values_list("role", flat=True).get(workspace_id=workspace_id, user_id=user_id)
+    except WorkspaceMember.DoesNotExist:
+        return NOT_A_MEMBER
+
+    if role in DEFAULT_ROLE_PERMISSIONS:
+        return role, DEFAULT_ROLE_PERMISSIONS[role]
+
+    try:
+        custom_role = CustomRole.objects.get(workspace_id=workspace_id, name=role)
+    except CustomRole.DoesNotExist:
+        return role, None
+    return role, frozenset(custom_role.permissions)
+
+
+def resolve_permissions(request, workspace_id, user_id=None):
+    """Return (role, permissions) for a user in a workspace; role is None for non-members
+    and permissions is None when the member's role no longer exists."""
+    user_id = user_id or request.user.id
+    memo = getattr(request, "_workspace_permissions", None)
+    if memo is None:
+        memo = request._workspace_permissions = {}
+
+    if (workspace_id, user_id) not in memo:
+        key = permission_cache_key(workspace_id, user_id)
+        resolved = cache.get(key)
+        if resolved is None:
+            resolved = compile_permissions(workspace_id, user_id)
+            cache.set(key, resolved, timeout=PERMISSION_CACHE_TIMEOUT)
+        memo[(workspace_id, user_id)] = tuple(resolved)
+
+    return memo[(workspace_id, user_id)]
+
+
+def invalidate_permissions(workspace_id, user_ids):
+    cache.delete_many([permission_cache_key(workspace_id, user_id) for user_id in user_ids])
+
+
+def has_permissions(role_perms, required_permissions):
+    return "*" in role_perms or all(p in role_perms for p in required_permissions)
+
+
+def status_update_error(role, role_perms, issue, user):
+    if role is None:
+        return "You are not a member of this workspace."
+
+    if role in ["owner", "manager"]:
+        return None
+
+    if not role_perms or not has_permissions(role_perms, ["update_status"]):
+        return "You don't have permission to update status."
+
+    if issue.assignee_id != user.id:
+        return "You can only update status of issues assigned to you."
+
+    return None
+
+
 class HasWorkspacePermission(BasePermission):
     def has_permission(self, request, view):
         required_permissions = getattr(view, 'required_permissions', [])
@@ -15,37 +90,19 @@ class HasWorkspacePermission(BasePermission):
         if not current_workspace:
             return False
 
-        try:
-            member = WorkspaceMember.objects.get(workspace=current_workspace, user=request.user)
-        except WorkspaceMember.DoesNotExist:
+        role, role_perms = resolve_permissions(request, current_workspace.id)
+        if role is None:
             return False
 
-        role = member.role
-
-        default_role_permissions = {
-            "owner": ["*"],
-            "manager": ["create_project","create_epic", "start_sprint","update_status"],
-            "developer": ["update_status"],
-            "designer": ["update_status"],
-        }
-
-        if role in default_role_permissions:
-            role_perms = default_role_permissions[role]
-            if "*" in role_perms or all(p in role_perms for p in required_permissions):
-                return True
-            self.message = "You do not have the required permissions."
-            return False
-
-        try:
-            custom_role = CustomRole.objects.get(workspace=current_workspace, name=role)
-            if all(p in custom_role.permissions for p in required_permissions):
-                return True
-            self.message = "You do not have the required permissions."
-            return False
-        except CustomRole.DoesNotExist:
+        if role_perms is None:
             self.message = "Your role does not exist."
             return False
 
+        if has_permissions(role_perms, required_permissions):
+            return True
+        self.message = "You do not have the required permissions."
+        return False
+
 
 # class HasRoleInWorkspace(BasePermission):
 #     def has_permission(self, request, view):
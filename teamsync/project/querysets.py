@@ -0,0 +1,16 @@
+from django.db.models import Prefetch
+from .models import Issue
+
+
+def plan_issue_queryset(queryset, fields=None):
+    """Add the joins/prefetches the issue serializers need for ``fields`` (all fields when None)."""
+    if fields is None or "attachments" in fields:
+        queryset = queryset.prefetch_related("attachments")
+    return queryset
+
+
+def plan_sprint_queryset(queryset):
+    """Prefetch sprint issues (and their attachments) for SprintWithIssuesSerializer."""
+    return queryset.prefetch_related(
+        Prefetch("issues", queryset=plan_issue_queryset(Issue.objects.all()))
+    )
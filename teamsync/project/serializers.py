@@ -94,6 +94,28 @@ class IssueSerializer(serializers.ModelSerializer):
         return data
 
 
+class IssueListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Issue
+        fields = [
+            'id', 'title', 'description', 'type', 'status', 'parent', 'project', 'sprint',
+            'assignee', 'created_at', 'updated_at', 'start_date', 'end_date', 'is_completed',
+        ]
+
+    def __init__(self, *args, **kwargs):
+        selected = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+
+        if not selected:
+            return
+
+        if "attachments" in selected:
+            self.fields["attachments"] = AttachmentSerializer(many=True, read_only=True)
+
+        for name in set(self.fields) - set(selected):
+            self.fields.pop(name)
+
+
 class SprintSerializer(serializers.ModelSerializer):
     class Meta:
         model = Sprint
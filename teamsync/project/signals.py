@@ -0,0 +1,181 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from workspace.models import WorkspaceMember, CustomRole
+from workspace.middleware import project_workspace_lru
+from .models import Project, Issue, ProjectStats
+from .permissions import invalidate_permissions
+from .utils import invalidate_sprint_issue_summaries
+
+STATS_FIELDS = ("project_id", "type", "status", "parent_id")
+STATS_UPDATE_FIELDS = {"project", "project_id", "type", "status", "parent", "parent_id"}
+SPRINT_STATUS_FIELDS = ("sprint_id", "type", "status", "is_completed")
+
+
+def stats_state(issue):
+    return issue.type, issue.status, issue.parent_id
+
+
+@receiver(post_init, sender=Issue)
+def remember_issue_stats_state(sender, instance, **kwargs):
+    # Read from __dict__ so deferred fields (e.g. .only() projections) are not loaded.
+    if instance.pk and all(f in instance.__dict__ for f in STATS_FIELDS):
+        instance._stats_snapshot = (instance.project_id, stats_state(instance))
+    else:
+        instance._stats_snapshot = None
+
+    if instance.pk and all(f in instance.__dict__ for f in SPRINT_STATUS_FIELDS):
+        instance._sprint_status_snapshot = tuple(instance.__dict__[f] for f in SPRINT_STATUS_FIELDS)
+    else:
+        instance._sprint_status_snapshot = None
+
+
+def lock_stats_snapshots(issues):
+    """
+    Re-read the stats state of stored issues under a row lock.
+
+    Deltas must start from the row as it is now, not from the copy the caller loaded: two
+    saves from the same stale read would otherwise both subtract the same old state. Must run
+    inside the transaction that writes the issues.
+    """
+    rows = {
+        row[0]: (row[1], row[2:])
+        for row in Issue.objects.select_for_update()
+        .filter(pk__in=[issue.pk for issue in issues])
+        .values_list("pk", *STATS_FIELDS)
+    }
+    for issue in issues:
+        issue._stats_snapshot = rows.get(issue.pk)
+
+
+@receiver(pre_save, sender=Issue)
+def lock_issue_stats_state(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not STATS_UPDATE_FIELDS & set(update_fields):
+        return
+    lock_stats_snapshots([instance])
+
+
+@receiver(pre_delete, sender=Issue)
+def lock_deleted_issue_stats_state(sender, instance, **kwargs):
+    # Collector.delete() sends pre_delete inside its own transaction.
+    lock_stats_snapshots([instance])
+
+
+def rebuild_project_stats(project_id):
+    # Projects without a stats row are built lazily on first read.
+    if ProjectStats.objects.filter(project_id=project_id).exists():
+        ProjectStats.rebuild(project_id)
+
+
+def update_project_stats(project_id, changes):
+    with transaction.atomic():
+        stats = ProjectStats.objects.select_for_update().filter(project_id=project_id).first()
+        if stats is None:
+            return
+        for state, delta in changes:
+            stats.apply(state, delta)
+        stats.save(update_fields=["counts_by_type", "counts_by_status", "epic_progress", "updated_at"])
+
+
+@receiver(post_save, sender=Issue)
+def track_issue_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created and update_fields is not None and not STATS_UPDATE_FIELDS & set(update_fields):
+        return
+
+    new_state = stats_state(instance)
+    snapshot = instance._stats_snapshot
+
+    if created:
+        update_project_stats(instance.project_id, [(new_state, 1)])
+    elif snapshot is None:
+        rebuild_project_stats(instance.project_id)
+    else:
+        old_project_id, old_state = snapshot
+        if old_project_id != instance.project_id:
+            update_project_stats(old_project_id, [(old_state, -1)])
+            update_project_stats(instance.project_id, [(new_state, 1)])
+        elif old_state != new_state:
+            update_project_stats(instance.project_id, [(old_state, -1), (new_state, 1)])
+
+    instance._stats_snapshot = (instance.project_id, new_state)
+
+
+@receiver(post_delete, sender=Issue)
+def track_issue_deleted(sender, instance, **kwargs):
+    snapshot = instance._stats_snapshot
+    if snapshot is None:
+        rebuild_project_stats(instance.project_id)
+        return
+
+    project_id, state = snapshot
+    update_project_stats(project_id, [(state, -1)])
+
+
+@receiver(post_save, sender=Issue)
+def invalidate_sprint_status_on_save(sender, instance, created, **kwargs):
+    snapshot = instance._sprint_status_snapshot
+    current = tuple(getattr(instance, f) for f in SPRINT_STATUS_FIELDS)
+
+    if created or snapshot is None:
+        invalidate_sprint_issue_summaries(instance.sprint_id)
+    elif snapshot != current:
+        invalidate_sprint_issue_summaries(snapshot[0], instance.sprint_id)
+
+    instance._sprint_status_snapshot = current
+
+
+@receiver(post_delete, sender=Issue)
+def invalidate_sprint_status_on_delete(sender, instance, **kwargs):
+    invalidate_sprint_issue_summaries(instance.sprint_id)
+
+
+def issues_bulk_updated(issues):
+    # bulk_update() sends no signals, so apply the same bookkeeping by hand.
+    stats_changes = defaultdict(list)
+    stale_projects = set()
+    stale_sprints = set()
+
+    for issue in issues:
+        new_state = stats_state(issue)
+        if issue._stats_snapshot is None:
+            stale_projects.add(issue.project_id)
+        else:
+            old_project_id, old_state = issue._stats_snapshot
+            if (old_project_id, old_state) != (issue.project_id, new_state):
+                stats_changes[old_project_id].append((old_state, -1))
+                stats_changes[issue.project_id].append((new_state, 1))
+        issue._stats_snapshot = (issue.project_id, new_state)
+
+        current = tuple(getattr(issue, f) for f in SPRINT_STATUS_FIELDS)
+        if issue._sprint_status_snapshot != current:
+            stale_sprints.add(issue.sprint_id)
+            if issue._sprint_status_snapshot:
+                stale_sprints.add(issue._sprint_status_snapshot[0])
+        issue._sprint_status_snapshot = current
+
+    for project_id, changes in stats_changes.items():
+        update_project_stats(project_id, changes)
+    for project_id in stale_projects:
+        rebuild_project_stats(project_id)
+    invalidate_sprint_issue_summaries(*stale_sprints)
+
+
+@receiver(post_save, sender=WorkspaceMember)
+@receiver(post_delete, sender=WorkspaceMember)
+def invalidate_member_permissions(sender, instance, **kwargs):
+    invalidate_permissions(instance.workspace_id, [instance.user_id])
+
+
+@receiver(post_save, sender=CustomRole)
+@receiver(post_delete, sender=CustomRole)
+def invalidate_role_permissions(sender, instance, **kwargs):
+    user_ids = WorkspaceMember.objects.filter(workspace_id=instance.workspace_id).values_list("user_id", flat=True)
+    invalidate_permissions(instance.workspace_id, list(user_ids))
+
+
+@receiver(post_delete, sender=Project)
+def forget_project_workspace(sender, instance, **kwargs):
+    project_workspace_lru.discard(instance.id)
@@ -1,3 +1,63 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounts.models import Accounts
+from workspace.models import Workspace, WorkspaceMember
+from .models import Project, Issue, Sprint, Attachment
 
 # Create your tests here.
+
+
+class IssueListQueryCountTests(TestCase):
+    def setUp(self):
+        self.user = Accounts.objects.create_user(email="owner@example.com", password="pass")
+        self.workspace = Workspace.objects.create(name="Acme", owner=self.user)
+        WorkspaceMember.objects.create(user=self.user, workspace=self.workspace, role="owner")
+        self.project = Project.objects.create(name="Board", workspace=self.workspace, owner=self.user)
+        self.active_sprint = Sprint.objects.create(project=self.project, is_active=True)
+        self.completed_sprint = Sprint.objects.create(project=self.project, is_completed=True)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_issues(self, count):
+        for i in range(count):
+            epic = Issue.objects.create(title=f"Epic {i}", type="epic", project=self.project)
+            Attachment.objects.create(issue=epic, type="link", url="https://example.com")
+            for sprint in (self.active_sprint, self.completed_sprint):
+                issue = Issue.objects.create(
+                    title=f"Issue {i}", type="task", project=self.project,
+                    parent=epic, sprint=sprint, assignee=self.user,
+                )
+                Attachment.objects.create(issue=issue, type="link", url="https://example.com")
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertQueryCountIsBounded(self, url):
+        self.add_issues(1)
+        small = self.count_queries(url)
+        self.add_issues(10)
+        large = self.count_queries(url)
+        self.assertEqual(small, large, f"{url} issues a query per row ({small} -> {large})")
+
+    def test_project_issues(self):
+        self.assertQueryCountIsBounded(f"/api/v1/project/{self.project.id}/issues/list/")
+
+    def test_project_issues_paginated_with_attachments(self):
+        self.assertQueryCountIsBounded(
+            f"/api/v1/project/{self.project.id}/issues/list/?limit=100&fields=id,title,attachments"
+        )
+
+    def test_project_epics(self):
+        self.assertQueryCountIsBounded(f"/api/v1/project/{self.project.id}/epics/")
+
+    def test_active_sprint_issues(self):
+        self.assertQueryCountIsBounded(f"/api/v1/project/{self.project.id}/active-sprint-issues/")
+
+    def test_completed_sprints_with_issues(self):
+        self.assertQueryCountIsBounded(f"/api/v1/project/{self.project.id}/completed-sprints/")
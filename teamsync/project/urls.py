@@ -10,10 +10,12 @@ from .views import (
     AssignParentEpicView,
     AssignAssigneeToIssueView,
     UpdateIssueStatusView,
+    IssueBulkUpdateView,
     ProjectSprintListCreateView,
     SprintDetailView,
     ActiveSprintIssueListView,
     SprintIssueStatusView,
+    SprintIssueStatusBatchView,
     CompleteSprintAPIView,
     AttachmentListCreateView,
     AttachmentDeleteView,
@@ -33,12 +35,14 @@ urlpatterns = [
      path('issue/assign-parent/', AssignParentEpicView.as_view(), name='assign-parent'),
      path('issue/<int:issue_id>/assign-assignee/', AssignAssigneeToIssueView.as_view(), name='assign-assignee'),
      path('issue/<int:issue_id>/status/', UpdateIssueStatusView.as_view(), name='update-issue-status'),
+     path('issues/bulk-update/', IssueBulkUpdateView.as_view(), name='issue-bulk-update'),
      path("issue/<int:pk>/", IssueDetailUpdateView.as_view(), name="issue-detail"),
      path('issue/<int:pk>/delete/', DeleteIssueView.as_view(), name='delete-issue'),
      path('<int:project_id>/sprints/', ProjectSprintListCreateView.as_view(), name='project-sprint-list-create'),
      path('sprints/<int:pk>/', SprintDetailView.as_view(), name='sprint-detail'),
      path('<int:project_id>/active-sprint-issues/', ActiveSprintIssueListView.as_view(), name='active-sprint-issues'),
      path("sprints/<int:sprint_id>/issues/", SprintIssueStatusView.as_view(), name="sprint-issue-status"),
+     path("sprints/issues/status/", SprintIssueStatusBatchView.as_view(), name="sprint-issue-status-batch"),
      path('<int:project_id>/sprints/<int:sprint_id>/complete/', CompleteSprintAPIView.as_view(), name='complete-sprint'),
      path('<int:project_id>/completed-sprints/', CompletedSprintsWithIssuesView.as_view(), name='completed-sprints-with-issues'),
      path('issues/<int:issue_id>/attachments/', AttachmentListCreateView.as_view(), name='attachment-list-create'),
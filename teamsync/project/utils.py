@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.db.models import Count, Q
+from .models import Sprint
+
+SPRINT_STATUS_CACHE_TIMEOUT = 30
+SPRINT_ISSUE_TYPES = ["task", "story", "bug"]
+
+
+def sprint_status_key(sprint_id):
+    return f"sprint_{sprint_id}_issue_status"
+
+
+def get_sprint_issue_summaries(sprint_ids):
+    keys = {sprint_status_key(sprint_id): sprint_id for sprint_id in sprint_ids}
+    cached = cache.get_many(keys)
+    summaries = {keys[key]: data for key, data in cached.items()}
+
+    missing = [sprint_id for sprint_id in sprint_ids if sprint_id not in summaries]
+    if missing:
+        open_issue = Q(issues__type__in=SPRINT_ISSUE_TYPES, issues__is_completed=False)
+        sprints = Sprint.objects.filter(id__in=missing).annotate(
+            total=Count("issues", filter=open_issue),
+            incomplete=Count("issues", filter=open_issue & ~Q(issues__status="done")),
+        ).values("id", "name", "total", "incomplete")
+
+        fresh = {}
+        for sprint in sprints:
+            fresh[sprint["id"]] = {
+                "sprint_id": sprint["id"],
+                "sprint_name": sprint["name"],
+                "total_issues": sprint["total"],
+                "incomplete_issues": sprint["incomplete"],
+                "complete_issues": sprint["total"] - sprint["incomplete"],
+                "all_done": sprint["incomplete"] == 0,
+            }
+
+        cache.set_many(
+            {sprint_status_key(sprint_id): data for sprint_id, data in fresh.items()},
+            timeout=SPRINT_STATUS_CACHE_TIMEOUT,
+        )
+        summaries.update(fresh)
+
+    return summaries
+
+
+def invalidate_sprint_issue_summaries(*sprint_ids):
+    cache.delete_many([sprint_status_key(sprint_id) for sprint_id in sprint_ids if sprint_id])
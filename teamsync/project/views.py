@@ -1,32 +1,36 @@
 from rest_framework.generics import CreateAPIView,  RetrieveAPIView, RetrieveUpdateAPIView,RetrieveUpdateDestroyAPIView, ListCreateAPIView, DestroyAPIView, UpdateAPIView
 from rest_framework.views import APIView 
 from .models import Project, Issue, Sprint, Attachment
-from workspace.models import Workspace, WorkspaceMember, CustomRole
-from .serializers import ProjectSerializer, IssueSerializer, IssueCreateSerializer, SprintSerializer, AttachmentSerializer, SprintWithIssuesSerializer
+from workspace.models import Workspace, WorkspaceMember
+from .serializers import ProjectSerializer, IssueSerializer, IssueCreateSerializer, SprintSerializer, AttachmentSerializer, SprintWithIssuesSerializer, IssueListSerializer
+from .pagination import IssueKeysetPagination
+from .querysets import plan_issue_queryset, plan_sprint_queryset
+from .utils import get_sprint_issue_summaries, invalidate_sprint_issue_summaries
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 from rest_framework.exceptions import NotFound
 from django.core.exceptions import ObjectDoesNotExist
-from .permissions import HasWorkspacePermission
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
-from realtime.models import Notification
+from .permissions import HasWorkspacePermission, resolve_permissions, status_update_error
+from .signals import issues_bulk_updated, lock_stats_snapshots
+from workspace.middleware import lazy_workspace
+from realtime.notifications import notify
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.db import transaction
 import cloudinary.uploader
 from django.db.models import Q
+from django.utils.timezone import now
 
 
 class CompletedSprintsWithIssuesView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, project_id):
-        completed_sprints = Sprint.objects.filter(
+        completed_sprints = plan_sprint_queryset(Sprint.objects.filter(
             project_id=project_id,
             is_completed=True
-        ).prefetch_related('issues', 'issues__assignee')  # optimize DB access
+        ))
 
         serializer = SprintWithIssuesSerializer(completed_sprints, many=True)
         return Response(serializer.data)
@@ -42,11 +46,7 @@ class CreateProjectView(CreateAPIView):
     def initial(self, request, *args, **kwargs):
 
         workspace_id = request.data.get("workspaceId")
-
-        try:
-            request.current_workspace = Workspace.objects.get(id=workspace_id)
-        except Workspace.DoesNotExist:
-            request.current_workspace = None
+        request.current_workspace = lazy_workspace(workspace_id=workspace_id)
 
         return super().initial(request, *args, **kwargs)
 
@@ -134,7 +134,7 @@ class IssueDetailView(RetrieveAPIView):
 
 
 class IssueDetailUpdateView(RetrieveUpdateAPIView):
-    queryset = Issue.objects.all()
+    queryset = plan_issue_queryset(Issue.objects.all())
     serializer_class = IssueSerializer
     permission_classes = [IsAuthenticated]  
     
@@ -160,7 +160,7 @@ class IssueDetailUpdateView(RetrieveUpdateAPIView):
 
 class ProjectEpicsView(APIView):
     def get(self, request, project_id):
-        epics = Issue.objects.filter(project_id=project_id, type="epic")
+        epics = plan_issue_queryset(Issue.objects.filter(project_id=project_id, type="epic"))
         serializer = IssueSerializer(epics, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)        
     
@@ -212,7 +212,32 @@ class ProjectIssuesView(APIView):
         if assignee_filter:
             issues_qs = issues_qs.filter(assignee_filter)
 
-        serializer = IssueSerializer(issues_qs, many=True)
+        fields_param = request.query_params.get("fields")
+        paginator = IssueKeysetPagination()
+
+        if not fields_param and not paginator.is_requested(request):
+            serializer = IssueSerializer(plan_issue_queryset(issues_qs), many=True)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        fields = None
+        if fields_param:
+            fields = [f.strip() for f in fields_param.split(",") if f.strip()]
+            allowed = IssueListSerializer.Meta.fields + ["attachments"]
+            invalid = [f for f in fields if f not in allowed]
+            if invalid:
+                return Response({"detail": f"Invalid fields: {invalid}"}, status=status.HTTP_400_BAD_REQUEST)
+
+            columns = {"id", "updated_at"} | {f for f in fields if f != "attachments"}
+            issues_qs = issues_qs.only(*columns)
+
+        issues_qs = plan_issue_queryset(issues_qs, fields=fields or [])
+
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(issues_qs, request, view=self)
+            serializer = IssueListSerializer(page, many=True, fields=fields)
+            return paginator.get_paginated_response(serializer.data)
+
+        serializer = IssueListSerializer(issues_qs, many=True, fields=fields)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
 
@@ -266,29 +291,11 @@ class AssignAssigneeToIssueView(APIView):
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
         if request.user.id != membership.user_id:
-            workspace = issue.project.workspace
-            message = f"You've been assigned to issue: {issue.title}"
-            notification = Notification.objects.create(
-                recipient=membership.user,
-                workspace=workspace,
-                message=message
-            )
-
-            channel_layer = get_channel_layer()
-            group_name = f"workspace_{workspace.id}_user_{membership.user.id}"
-            async_to_sync(channel_layer.group_send)(
-                group_name,
-                {
-                    "type": "send_notification",
-                    "content": {
-                        "message": notification.message,
-                        "workspace": {
-                            "id": workspace.id,
-                            "name": workspace.name,
-                        },
-                    }
-                }
-            )
+            notify([(
+                membership.user_id,
+                issue.project.workspace,
+                f"You've been assigned to issue: {issue.title}",
+            )])
 
         return Response(
             {"id": issue_id, "assignee": membership.user_id},
@@ -308,50 +315,156 @@ class UpdateIssueStatusView(APIView):
             return Response({"error": "Invalid status value."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            issue = Issue.objects.select_related("project__workspace", "assignee").get(id=issue_id)
+            issue = Issue.objects.select_related("project").get(id=issue_id)
         except Issue.DoesNotExist:
             return Response({"error": "Issue not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        current_workspace = issue.project.workspace
-
-        try:
-            member = WorkspaceMember.objects.get(workspace=current_workspace, user=request.user)
-        except WorkspaceMember.DoesNotExist:
+        role, role_perms = resolve_permissions(request, issue.project.workspace_id)
+        if role is None:
             return Response({"error": "You are not a member of this workspace."}, status=status.HTTP_403_FORBIDDEN)
 
-        role = member.role
+        error = status_update_error(role, role_perms, issue, request.user)
+        if error:
+            return Response({"error": error}, status=status.HTTP_403_FORBIDDEN)
 
-        if role in ["owner", "manager"]:
-            issue.status = new_status
-            issue.save()
-            return Response({"issue_id": issue.id, "status": issue.status}, status=status.HTTP_200_OK)
+        issue.status = new_status
+        issue.save()
+        return Response({"issue_id": issue.id, "status": issue.status}, status=status.HTTP_200_OK)
+    
+
+def is_id(value):
+    # bool is an int subclass; JSON true/false must not pass as ids 1/0.
+    return isinstance(value, int) and not isinstance(value, bool)
 
-        has_permission = False
 
-        default_role_permissions = {
-            "developer": ["update_status"],
-            "designer": ["update_status"],
+class IssueBulkUpdateView(APIView):
+    permission_classes = [IsAuthenticated]
+    max_operations = 500
+    mutable_fields = ("status", "assignee", "sprint", "parent")
+    id_fields = ("assignee", "sprint", "parent")
+
+    def patch(self, request):
+        operations = request.data.get("operations") if isinstance(request.data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            return Response({"error": "operations must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(operations) > self.max_operations:
+            return Response({"error": f"At most {self.max_operations} operations are allowed."}, status=status.HTTP_400_BAD_REQUEST)
+
+        changes = {}
+        for index, op in enumerate(operations):
+            issue_id = op.get("issue_id") if isinstance(op, dict) else None
+            if not is_id(issue_id):
+                return Response({"error": f"Operation {index}: issue_id is required."}, status=status.HTTP_400_BAD_REQUEST)
+            fields = {k: op[k] for k in self.mutable_fields if k in op}
+            if not fields:
+                return Response({"error": f"Operation {index}: nothing to update."}, status=status.HTTP_400_BAD_REQUEST)
+            for key in self.id_fields:
+                if key in fields and fields[key] is not None and not is_id(fields[key]):
+                    return Response({"error": f"Operation {index}: {key} must be an id or null."}, status=status.HTTP_400_BAD_REQUEST)
+            changes.setdefault(issue_id, {}).update(fields)
+
+        issues = {
+            issue.id: issue
+            for issue in Issue.objects.select_related("project__workspace").filter(id__in=changes)
         }
+        missing = [issue_id for issue_id in changes if issue_id not in issues]
+        if missing:
+            return Response({"error": f"Issues not found: {missing}"}, status=status.HTTP_404_NOT_FOUND)
 
-        if role in default_role_permissions:
-            has_permission = "update_status" in default_role_permissions[role]
-        else:
-            try:
-                custom_role = CustomRole.objects.get(workspace=current_workspace, name=role)
-                has_permission = "update_status" in custom_role.permissions
-            except CustomRole.DoesNotExist:
-                has_permission = False
+        workspace_ids = {issue.project.workspace_id for issue in issues.values()}
+        resolved = {workspace_id: resolve_permissions(request, workspace_id) for workspace_id in workspace_ids}
+        if any(role is None for role, _ in resolved.values()):
+            return Response({"error": "You are not a member of this workspace."}, status=status.HTTP_403_FORBIDDEN)
 
-        if not has_permission:
-            return Response({"error": "You don't have permission to update status."}, status=status.HTTP_403_FORBIDDEN)
+        def referenced(key):
+            return {c[key] for c in changes.values() if c.get(key) is not None}
 
-        if issue.assignee != request.user:
-            return Response({"error": "You can only update status of issues assigned to you."}, status=status.HTTP_403_FORBIDDEN)
+        sprints = {s.id: s for s in Sprint.objects.filter(id__in=referenced("sprint"))}
+        epics = {e.id: e for e in Issue.objects.filter(id__in=referenced("parent"), type="epic")}
+        members = set(
+            WorkspaceMember.objects.filter(workspace_id__in=workspace_ids, user_id__in=referenced("assignee"))
+            .values_list("workspace_id", "user_id")
+        )
+
+        valid_statuses = [key for key, _ in Issue.STATUS_CHOICES]
+        errors = {}
+        assigned = []
+
+        for issue_id, fields in changes.items():
+            issue = issues[issue_id]
+            workspace_id = issue.project.workspace_id
+            role, role_perms = resolved[workspace_id]
+
+            if "status" in fields:
+                if fields["status"] not in valid_statuses:
+                    errors[issue_id] = "Invalid status value."
+                    continue
+                error = status_update_error(role, role_perms, issue, request.user)
+                if error:
+                    errors[issue_id] = error
+                    continue
+                issue.status = fields["status"]
+
+            if "assignee" in fields:
+                assignee_id = fields["assignee"]
+                if assignee_id is not None and (workspace_id, assignee_id) not in members:
+                    errors[issue_id] = "User is not part of the workspace."
+                    continue
+                if assignee_id != issue.assignee_id and assignee_id not in (None, request.user.id):
+                    assigned.append((assignee_id, issue))
+                issue.assignee_id = assignee_id
+
+            if "sprint" in fields:
+                sprint = sprints.get(fields["sprint"])
+                if fields["sprint"] is not None and (not sprint or sprint.project_id != issue.project_id or sprint.is_completed):
+                    errors[issue_id] = "Sprint not found in this project."
+                    continue
+                issue.sprint_id = fields["sprint"]
+
+            if "parent" in fields:
+                epic = epics.get(fields["parent"])
+                if issue.type == "epic":
+                    errors[issue_id] = "Cannot assign a parent to an epic"
+                    continue
+                if fields["parent"] is not None and (not epic or epic.project_id != issue.project_id):
+                    errors[issue_id] = "Epic not found in this project."
+                    continue
+                issue.parent_id = fields["parent"]
+
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        updated_fields = {
+            {"assignee": "assignee_id", "sprint": "sprint_id", "parent": "parent_id"}.get(f, f)
+            for fields in changes.values() for f in fields
+        }
+        updated_at = now()
+        for issue in issues.values():
+            issue.updated_at = updated_at
+
+        with transaction.atomic():
+            lock_stats_snapshots(issues.values())
+            Issue.objects.bulk_update(list(issues.values()), [*updated_fields, "updated_at"])
+            issues_bulk_updated(issues.values())
+
+            notify([
+                (assignee_id, issue.project.workspace, f"You've been assigned to issue: {issue.title}")
+                for assignee_id, issue in assigned
+            ])
+
+        return Response({
+            "updated": [
+                {
+                    "id": issue.id,
+                    "status": issue.status,
+                    "assignee": issue.assignee_id,
+                    "sprint": issue.sprint_id,
+                    "parent": issue.parent_id,
+                }
+                for issue in issues.values()
+            ]
+        }, status=status.HTTP_200_OK)
 
-        issue.status = new_status
-        issue.save()
-        return Response({"issue_id": issue.id, "status": issue.status}, status=status.HTTP_200_OK)
-    
 
 class DeleteIssueView(DestroyAPIView):
     queryset = Issue.objects.all()
@@ -461,7 +574,7 @@ class ActiveSprintIssueListView(APIView):
 
             issues_qs = issues_qs.filter(assignee_filter)
 
-        issue_data  = IssueSerializer(issues_qs,  many=True).data
+        issue_data  = IssueSerializer(plan_issue_queryset(issues_qs),  many=True).data
 
         return Response({
             "issues":  issue_data,
@@ -549,28 +662,44 @@ class SprintIssueStatusView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, sprint_id):
-        try:
-            sprint = Sprint.objects.get(id=sprint_id)
-        except Sprint.DoesNotExist:
+        data = get_sprint_issue_summaries([sprint_id]).get(sprint_id)
+        if data is None:
             return Response({"detail": "Sprint not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        issues = Issue.objects.filter(sprint=sprint, type__in=["task", "story", "bug"], is_completed=False)
-        total_issues = issues.count()
-        
+        return Response(data, status=status.HTTP_200_OK)
 
-        incomplete_issues = issues.exclude(status="done")
-        incomplete_count = incomplete_issues.count()
 
-        data = {
-            "sprint_id": sprint_id,
-            "sprint_name": sprint.name,
-            "total_issues": total_issues,
-            "incomplete_issues": incomplete_count,
-            "complete_issues": total_issues - incomplete_count,
-            "all_done": incomplete_count == 0,
-        }
+class SprintIssueStatusBatchView(APIView):
+    permission_classes = [IsAuthenticated]
+    max_ids = 200
+
+    def get(self, request):
+        sprint_param = request.query_params.get("ids", "")
+        tokens = [t.strip() for t in sprint_param.split(",") if t.strip()]
+        if len(tokens) > self.max_ids:
+            return Response({"detail": f"At most {self.max_ids} sprint IDs are allowed."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # isdigit() alone accepts Unicode digits such as "²", which int() rejects.
+        invalid = [t for t in tokens if not (t.isascii() and t.isdigit())]
+        if invalid:
+            return Response({"detail": f"Invalid sprint IDs: {invalid}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        sprint_ids = list(dict.fromkeys(int(t) for t in tokens))
+        if not sprint_ids:
+            return Response({"detail": "ids is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Sprints outside the caller's workspaces are left out, as if they did not exist.
+        visible = set(
+            Sprint.objects.filter(id__in=sprint_ids, project__workspace__members__user=request.user)
+            .values_list("id", flat=True)
+        )
+        sprint_ids = [sprint_id for sprint_id in sprint_ids if sprint_id in visible]
 
-        return Response(data, status=status.HTTP_200_OK)
+        summaries = get_sprint_issue_summaries(sprint_ids)
+        return Response(
+            {"sprints": [summaries[sprint_id] for sprint_id in sprint_ids if sprint_id in summaries]},
+            status=status.HTTP_200_OK
+        )
     
 
 
@@ -595,6 +724,7 @@ class CompleteSprintAPIView(APIView):
         incomplete_issues = issues.exclude(status="done")
 
         new_sprint = None
+        target_sprint = None
 
         if incomplete_issues.exists():
             action = request.data.get("action")
@@ -631,6 +761,8 @@ class CompleteSprintAPIView(APIView):
         sprint.is_active = False
         sprint.save()
 
+        invalidate_sprint_issue_summaries(sprint.id, new_sprint and new_sprint.id, target_sprint and target_sprint.id)
+
         data = {"sprint_id": sprint.id}
         if new_sprint:
             data["new_sprint"] = SprintSerializer(new_sprint).data
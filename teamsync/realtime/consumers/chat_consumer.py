@@ -1,7 +1,19 @@
 import json
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.db import database_sync_to_async
-from realtime.models import ChatMessage
+from django.db import transaction
+from django.db.models import Q
+from realtime.models import ChatMessage, Conversation
+from realtime.receipts import receipt_aggregator
+
+
+def parse_id(value):
+    """A positive integer id from a client frame (ints or digit strings, never bools); None otherwise."""
+    if isinstance(value, str) and value.isascii() and value.isdigit():
+        value = int(value)
+    if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+        return value
+    return None
 
 
 class ChatConsumer(AsyncJsonWebsocketConsumer):
@@ -29,6 +41,7 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
                 self.room_group_name,
                 {
                     "type": "read_update_event",
+                    "room": self.room_group_name,
                     "reader_id": self.user.id,
                     "message_ids": updated_message_ids,
                 }
@@ -37,7 +50,7 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
             await self.update_unread_summary_for_user(self.user.id)
             await self.update_unread_summary_for_user(self.receiver_id)
 
-        await self.send_previous_messages(offset=0, limit=20)
+        await self.send_previous_messages(limit=20)
 
     async def disconnect(self, close_code):
         if hasattr(self, 'room_group_name'):
@@ -53,10 +66,10 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
             message_ids = data.get("message_ids", [])
             await self.mark_messages_read(message_ids)
         elif message_type == "fetch_history":
-            offset = data.get("offset", 0)
+            before_id = data.get("before_id")
             limit = data.get("limit", 20)
             await self.mark_messages_delivered()
-            await self.send_previous_messages(offset=offset, limit=limit)
+            await self.send_previous_messages(before_id=before_id, limit=limit)
 
     async def handle_chat_message(self, data):
         text = data.get("text", "").strip()
@@ -75,6 +88,7 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
             self.room_group_name,
             {
                 "type": "chat_message_event",
+                "room": self.room_group_name,
                 "message": {
                     "id": message["id"],
                     "sender": self.user.id,
@@ -93,89 +107,80 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         message = event["message"]
 
         if self.user.id == message["receiver"]:
-            await self.mark_single_message_delivered(message["id"])
-
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    "type": "delivery_update_event",
-                    "message_id": message["id"],
-                    "receiver_id": self.user.id,
-                }
-            )
+            self.queue_receipts(delivered=[message["id"]])
 
         await self.send(text_data=json.dumps({
             "type": "chat_message",
             "message": message
         }))
 
-    async def delivery_update_event(self, event):
+    async def receipt_event(self, event):
         await self.send(text_data=json.dumps({
-            "type": "delivery_update",
-            "message_id": event["message_id"],
-            "receiver_id": event["receiver_id"],
+            "type": "receipt",
+            "reader_id": event["reader_id"],
+            "delivered_ids": event["delivered_ids"],
+            "read_ids": event["read_ids"],
         }))
 
     async def chat_message_update(self, event):
         await self.update_unread_summary_for_user(self.user.id)
     
-    async def send_previous_messages(self, offset=0, limit=20):
-        messages = await self.get_chat_history(offset=offset, limit=limit)
-        total_count = await self.get_total_message_count()
-        has_more = (offset + limit) < total_count
-        
+    async def send_previous_messages(self, before_id=None, limit=20):
+        if before_id in (None, ''):
+            before_id = None
+        else:
+            before_id = parse_id(before_id)
+            if before_id is None:
+                await self.send_error("before_id must be a positive integer.")
+                return
+
+        try:
+            limit = max(1, min(int(limit), 100))
+        except (TypeError, ValueError):
+            limit = 20
+
+        messages, has_more = await self.get_chat_history(before_id=before_id, limit=limit)
+
         await self.send(text_data=json.dumps({
             "type": "chat_history",
             "messages": messages,
-            "offset": offset,
+            "before_id": before_id,
+            "next_before_id": messages[0]["id"] if messages else None,
             "limit": limit,
             "has_more": has_more,
-            "total_count": total_count
         }))
 
     async def mark_messages_delivered(self):
         await self.set_delivered(sender_id=self.receiver_id, receiver_id=self.user.id, workspace_id=self.workspace_id)
 
-    async def mark_single_message_delivered(self, message_id):
-        await self.set_single_delivered(message_id)
-        await self.channel_layer.group_send(
-            f"presence_workspace_{self.workspace_id}",
-            {
-                "type": "presence_read_update",
-                "reader_id": self.user.id,
-                "receiver_id": self.receiver_id,
-                "workspace_id": self.workspace_id,
-            }
-        )
-
     async def mark_messages_read(self, message_ids):
-        if not message_ids:
+        if not isinstance(message_ids, list):
+            await self.send_error("message_ids must be a list.")
             return
 
-        await self.set_read(message_ids)
+        read = [parse_id(message_id) for message_id in message_ids]
+        invalid = [message_id for message_id, parsed in zip(message_ids, read) if parsed is None]
+        if invalid:
+            await self.send_error(f"Invalid message ids: {invalid}")
+            return
+        if read:
+            self.queue_receipts(read=read)
 
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                "type": "read_update_event", 
-                "reader_id": self.user.id,
-                "message_ids": message_ids,
-            }
-        )
+    async def send_error(self, error):
+        await self.send(text_data=json.dumps({"type": "error", "error": error}))
 
-        await self.channel_layer.group_send(
-            f"presence_workspace_{self.workspace_id}",
-            {
-                "type": "presence_read_update",
-                "reader_id": self.user.id,
-                "receiver_id": self.receiver_id,
-                "workspace_id": self.workspace_id,
-            }
+    def queue_receipts(self, delivered=(), read=()):
+        # Acks are coalesced per conversation and flushed as one UPDATE and one receipt frame.
+        receipt_aggregator.push(
+            self.channel_layer,
+            self.room_group_name,
+            workspace_id=self.workspace_id,
+            reader_id=self.user.id,
+            sender_id=self.receiver_id,
+            delivered=delivered,
+            read=read,
         )
 
-        await self.update_unread_summary_for_user(self.user.id)
-        await self.update_unread_summary_for_user(self.receiver_id)
-
     async def read_update_event(self, event):
         await self.send(text_data=json.dumps({
             "type": "read_update",
@@ -195,41 +200,39 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
 
     @database_sync_to_async
     def save_message(self, sender, receiver, workspace_id, text):
-        message = ChatMessage.objects.create(
-            sender_id=sender,
-            receiver_id=receiver,
-            workspace_id=workspace_id,
-            text=text,
-            is_delivered=False,
-            is_read=False
-        )
+        with transaction.atomic():
+            message = ChatMessage.objects.create(
+                sender_id=sender,
+                receiver_id=receiver,
+                workspace_id=workspace_id,
+                text=text,
+                is_delivered=False,
+                is_read=False
+            )
+            Conversation.record_message(message)
         return {
             "id": message.id,
             "timestamp": message.timestamp.isoformat()
         }
 
     @database_sync_to_async
-    def get_chat_history(self, offset=0, limit=20):
-        # Get total count first
-        total_count = ChatMessage.objects.filter(
-            workspace_id=self.workspace_id,
-            sender_id__in=[self.user.id, self.receiver_id],
-            receiver_id__in=[self.user.id, self.receiver_id],
-        ).count()
-        
-        if offset == 0:
-            # Initial load: get the last 20 messages (newest at bottom)
-            start_offset = max(0, total_count - limit)
-        else:
-            # Load more: get older messages above current ones
-            # offset represents how many messages we've already loaded
-            start_offset = max(0, total_count - limit - offset)
-        
-        qs = ChatMessage.objects.filter(
-            workspace_id=self.workspace_id,
-            sender_id__in=[self.user.id, self.receiver_id],
-            receiver_id__in=[self.user.id, self.receiver_id],
-        ).order_by("timestamp")[start_offset:start_offset + limit]
+    def get_chat_history(self, before_id=None, limit=20):
+        qs = ChatMessage.conversation(self.workspace_id, self.user.id, self.receiver_id)
+
+        if before_id:
+            anchor = qs.filter(id=before_id).values("timestamp").first()
+            if anchor is None:
+                return [], False
+            qs = qs.filter(
+                Q(timestamp__lt=anchor["timestamp"]) |
+                Q(timestamp=anchor["timestamp"], id__lt=before_id)
+            )
+
+        # Fetch one extra row to learn whether older messages exist without counting.
+        rows = list(qs.order_by("-timestamp", "-id")[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        rows.reverse()
 
         return [
             {
@@ -240,16 +243,8 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
                 "timestamp": msg.timestamp.isoformat(),
                 "is_read": msg.is_read,
                 "is_delivered": msg.is_delivered,
-            } for msg in qs
-        ]
-
-    @database_sync_to_async
-    def get_total_message_count(self):
-        return ChatMessage.objects.filter(
-            workspace_id=self.workspace_id,
-            sender_id__in=[self.user.id, self.receiver_id],
-            receiver_id__in=[self.user.id, self.receiver_id],
-        ).count()
+            } for msg in rows
+        ], has_more
 
     @database_sync_to_async
     def set_delivered(self, sender_id, receiver_id, workspace_id):
@@ -260,14 +255,6 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
             is_delivered=False
         ).update(is_delivered=True)
 
-    @database_sync_to_async
-    def set_single_delivered(self, message_id):
-        ChatMessage.objects.filter(id=message_id, is_delivered=False).update(is_delivered=True)
-
-    @database_sync_to_async
-    def set_read(self, message_ids):
-        ChatMessage.objects.filter(id__in=message_ids, is_read=False).update(is_read=True)
-
     @database_sync_to_async
     def mark_all_messages_read(self):
         qs = ChatMessage.objects.filter(
@@ -285,7 +272,10 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         message_ids = list(qs.values_list("id", flat=True))
 
         if message_ids:
-            qs.update(is_read=True)
+            with transaction.atomic():
+                # Only the listed ids: a message saved meanwhile stays unread and counted.
+                updated_count = ChatMessage.objects.filter(id__in=message_ids, is_read=False).update(is_read=True)
+                Conversation.mark_read(self.workspace_id, self.user.id, self.receiver_id, count=updated_count)
 
         return message_ids
 
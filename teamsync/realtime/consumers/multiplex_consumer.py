@@ -0,0 +1,173 @@
+import json
+from channels.consumer import get_handler_name
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.contrib.auth.models import AnonymousUser
+from .chat_consumer import ChatConsumer
+from .notification_consumer import NotificationConsumer
+from .presence_consumer import PresenceConsumer
+from .video_call_consumer import VideoCallConsumer
+
+
+# stream name -> (consumer, route kwargs it needs, channel-layer events it handles, one per socket?)
+STREAMS = {
+    "chat": (
+        ChatConsumer,
+        ("workspace_id", "receiver_id"),
+        {"chat_message_event", "read_update_event", "receipt_event"},
+        False,
+    ),
+    "presence": (
+        PresenceConsumer,
+        ("workspace_id",),
+        {"user_status", "presence_diff", "presence_read_update", "chat_message_update"},
+        True,
+    ),
+    "notifications": (
+        NotificationConsumer,
+        (),
+        {"send_notification"},
+        True,
+    ),
+    "calls": (
+        VideoCallConsumer,
+        (),
+        {"send_call_invite", "send_call_response"},
+        True,
+    ),
+}
+
+
+class SharedGroups:
+    """Channel layer proxy that reference-counts group membership for the shared channel."""
+
+    def __init__(self, channel_layer):
+        self.channel_layer = channel_layer
+        self.counts = {}
+
+    def __getattr__(self, name):
+        return getattr(self.channel_layer, name)
+
+    async def group_add(self, group, channel):
+        self.counts[group] = self.counts.get(group, 0) + 1
+        if self.counts[group] == 1:
+            await self.channel_layer.group_add(group, channel)
+
+    async def group_discard(self, group, channel):
+        count = self.counts.get(group, 0) - 1
+        if count > 0:
+            self.counts[group] = count
+            return
+        self.counts.pop(group, None)
+        await self.channel_layer.group_discard(group, channel)
+
+
+class MultiplexConsumer(AsyncJsonWebsocketConsumer):
+    """
+    One socket carrying chat, presence, notification and call sub-streams.
+
+    Client frames: {"stream", "action": "join"|"leave", "params"} or {"stream", "key", "payload"}.
+    Server frames: {"stream", "key", "event": "joined"|"closed"} or {"stream", "key", "payload"}.
+    Each stream runs the existing consumer unchanged on this connection's channel.
+    """
+
+    async def connect(self):
+        self.user = self.scope.get("user", AnonymousUser())
+        self.streams = {}
+        if not self.user.is_authenticated:
+            await self.close()
+            return
+
+        self.groups_proxy = SharedGroups(self.channel_layer)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        for key in list(getattr(self, "streams", {})):
+            await self.leave(key, close_code)
+
+    async def receive_json(self, content):
+        stream = content.get("stream")
+        if stream not in STREAMS:
+            await self.send_json({"type": "error", "error": f"Unknown stream: {stream}"})
+            return
+
+        action = content.get("action")
+        if action == "join":
+            await self.join(stream, content.get("params") or {})
+        elif action == "leave":
+            await self.leave(self.stream_key(stream, content.get("key")))
+        else:
+            consumer = self.streams.get(self.stream_key(stream, content.get("key")))
+            if consumer is None:
+                await self.send_json({"stream": stream, "key": content.get("key"), "event": "closed"})
+                return
+            await consumer.receive(text_data=json.dumps(content.get("payload") or {}))
+
+    async def dispatch(self, message):
+        if message["type"].startswith("websocket."):
+            return await super().dispatch(message)
+
+        handler_name = get_handler_name(message)
+        for key, consumer in list(self.streams.items()):
+            stream = key[0]
+            if message["type"] not in STREAMS[stream][2]:
+                continue
+            # Chat room events carry their room so each peer stream only sees its own.
+            if stream == "chat" and message.get("room") != consumer.room_group_name:
+                continue
+            await getattr(consumer, handler_name)(message)
+
+    def stream_key(self, stream, key=None):
+        return (stream, str(key) if key is not None and not STREAMS[stream][3] else "")
+
+    async def join(self, stream, params):
+        consumer_class, required, _, single = STREAMS[stream]
+        try:
+            kwargs = {name: int(params[name]) for name in required}
+        except (KeyError, TypeError, ValueError):
+            await self.send_json({"type": "error", "stream": stream, "error": f"Missing params: {', '.join(required)}"})
+            return
+
+        key = self.stream_key(stream, ":".join(str(kwargs[name]) for name in required))
+        if key in self.streams:
+            if not single:
+                return
+            await self.leave(key)
+
+        consumer = consumer_class()
+        consumer.scope = {**self.scope, "url_route": {"args": (), "kwargs": kwargs}}
+        consumer.channel_layer = self.groups_proxy
+        consumer.channel_name = self.channel_name
+        consumer.base_send = lambda message: self.forward(key, message)
+        consumer.stream_closed = False
+        consumer.stream_public_key = ":".join(str(kwargs[name]) for name in required)
+
+        self.streams[key] = consumer
+        await consumer.connect()
+        if consumer.stream_closed:
+            await self.leave(key)
+
+    async def leave(self, key, close_code=1000):
+        consumer = self.streams.pop(key, None)
+        if consumer is None:
+            return
+        await consumer.disconnect(close_code)
+        if not consumer.stream_closed:
+            consumer.stream_closed = True
+            await self.send_json({"stream": key[0], "key": consumer.stream_public_key, "event": "closed"})
+
+    async def forward(self, key, message):
+        consumer = self.streams.get(key)
+        if consumer is None:
+            return
+
+        frame = {"stream": key[0], "key": consumer.stream_public_key}
+        if message["type"] == "websocket.accept":
+            frame["event"] = "joined"
+        elif message["type"] == "websocket.close":
+            consumer.stream_closed = True
+            frame["event"] = "closed"
+        elif message.get("text") is not None:
+            frame["payload"] = json.loads(message["text"])
+        else:
+            return
+        await self.send_json(frame)
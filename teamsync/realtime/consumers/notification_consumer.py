@@ -1,11 +1,15 @@
 import json
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
-from realtime.models import Notification
+from realtime.models import Notification, NotificationCounter
 from workspace.models import WorkspaceMember 
 
 class NotificationConsumer(AsyncWebsocketConsumer):
+    page_size = 30
+    max_page_size = 100
+
     async def connect(self):
         self.user = self.scope.get('user', AnonymousUser())
         print("WS CONNECT: ", self.user)
@@ -27,12 +31,9 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 
         await self.accept()
 
-        data = await self.fetch_all_workspace_notifications(self.user.id)
-        await self.send(json.dumps({
-            'type': 'init',
-            'notifications': data['notifications'],
-            'unread_count': data['unread_count'],
-        }))
+        # Reconnecting clients pass ?since=<last seen id> and only receive what they missed.
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        await self.send_page('init', since=query.get('since', [None])[0], limit=query.get('limit', [None])[0])
 
     async def disconnect(self, close_code):
         for group_name in getattr(self, 'group_names', []):
@@ -43,10 +44,30 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 
         if data.get('type') == 'mark_read':
             await self.mark_all_as_read(self.user.id)
+        elif data.get('type') == 'sync':
+            await self.send_page('sync', since=data.get('since'), limit=data.get('limit'))
+        elif data.get('type') == 'fetch_older':
+            await self.send_page('older', before=data.get('before_id'), limit=data.get('limit'))
+
+    async def send_page(self, frame_type, since=None, before=None, limit=None):
+        try:
+            limit = max(1, min(int(limit), self.max_page_size))
+        except (TypeError, ValueError):
+            limit = self.page_size
+
+        try:
+            since = int(since) if since not in (None, '') else None
+            before = int(before) if before not in (None, '') else None
+        except (TypeError, ValueError):
+            since = before = None
+
+        data = await self.fetch_notifications_page(self.user.id, since, before, limit)
+        await self.send(json.dumps({'type': frame_type, **data}))
 
     async def send_notification(self, event):
         await self.send(json.dumps({
             'type': 'new',
+            'id': event['content'].get('id'),
             'message': event['content']['message'],
             'workspace': event['content'].get('workspace'), 
         }))
@@ -59,16 +80,24 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         )
 
     @database_sync_to_async
-    def fetch_all_workspace_notifications(self, user_id):
-        qs = Notification.objects.filter(
-            recipient_id=user_id
-        ).select_related('workspace').order_by('-created_at')
+    def fetch_notifications_page(self, user_id, since, before, limit):
+        qs = Notification.objects.filter(recipient_id=user_id).select_related('workspace')
+
+        if since is not None:
+            # Catch-up: oldest missed first, so the client can continue from last_id.
+            rows = list(qs.filter(id__gt=since).order_by('id')[:limit + 1])
+        else:
+            if before is not None:
+                qs = qs.filter(id__lt=before)
+            rows = list(qs.order_by('-id')[:limit + 1])
 
-        unread_count = qs.filter(is_read=False).count()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
 
         return {
             'notifications': [
                 {
+                    'id': n.id,
                     'message': n.message,
                     'created_at': n.created_at.isoformat(),
                     'is_read': n.is_read,
@@ -76,14 +105,18 @@ class NotificationConsumer(AsyncWebsocketConsumer):
                         'id': n.workspace.id,
                         'name': n.workspace.name,
                     }
-                } for n in qs
+                } for n in rows
             ],
-            'unread_count': unread_count,
+            'unread_count': NotificationCounter.get_unread(user_id),
+            'last_id': max((n.id for n in rows), default=since),
+            'has_more': has_more,
         }
 
     @database_sync_to_async
     def mark_all_as_read(self, user_id):
-        Notification.objects.filter(
+        updated = Notification.objects.filter(
             recipient_id=user_id,
             is_read=False
         ).update(is_read=True)
+        if updated:
+            NotificationCounter.remove(user_id, updated)
@@ -3,9 +3,10 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.auth import get_user_model
-from realtime.models import ChatMessage
-from django.db.models import Count, Q
-from realtime.utils import get_online_users_in_workspace
+from django.db import transaction
+from realtime.models import ChatMessage, Conversation
+from django.db.models import Q
+from realtime.utils import presence_store, presence_debouncer
 
 User = get_user_model()
 
@@ -30,40 +31,26 @@ class PresenceConsumer(AsyncWebsocketConsumer):
         await self.channel_layer.group_add(self.presence_group, self.channel_name)
         await self.accept()
 
-        await self.add_user_to_cache()
+        connection_count = await self.add_user_to_cache()
 
         online_users = await self.get_online_users_in_workspace()
 
-        for uid in online_users:
-            if str(uid) != str(self.user.id):
-                await self.send(text_data=json.dumps({
-                    "type": "presence",
-                    "user_id": uid,
-                    "status": "online",
-                }))
+        await self.send(text_data=json.dumps({
+            "type": "presence_snapshot",
+            "user_ids": [uid for uid in online_users if uid != self.user.id],
+        }))
 
-        await self.channel_layer.group_send(
-            self.group_name,
-            {
-                "type": "user_status",
-                "user_id": self.user.id,
-                "status": "online",
-            },
-        )
+        # Only the first tab announces the user; later tabs just join the groups.
+        if connection_count == 1:
+            self.announce("online")
 
 
     async def disconnect(self, close_code):
         if hasattr(self, "workspace_id"):
-            await self.remove_user_from_cache()
-
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    "type": "user_status",
-                    "user_id": self.user.id,
-                    "status": "offline",
-                },
-            )
+            remaining = await self.remove_user_from_cache()
+
+            if remaining == 0:
+                self.announce("offline")
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
             await self.channel_layer.group_discard(self.user_group, self.channel_name)
             await self.channel_layer.group_discard(self.presence_group, self.channel_name)
@@ -82,6 +69,13 @@ class PresenceConsumer(AsyncWebsocketConsumer):
                 "status": "online" if is_online else "offline",
             }))
 
+        elif data.get("type") == "heartbeat":
+            await self.refresh_heartbeat()
+            await self.send(text_data=json.dumps({
+                "type": "heartbeat_ack",
+                "interval": presence_store.heartbeat_interval,
+            }))
+
         elif data.get("type") == "get_unread_summary":
             summary = await self.get_unread_summary_with_last_message()
             await self.send(text_data=json.dumps({
@@ -98,6 +92,25 @@ class PresenceConsumer(AsyncWebsocketConsumer):
             "status": event["status"],
         }))
 
+    async def presence_diff(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "presence_diff",
+            "online": event["online"],
+            "offline": event["offline"],
+        }))
+
+    def announce(self, status):
+        presence_debouncer.push(self.channel_layer, self.workspace_id, self.user.id, status)
+
+    async def refresh_heartbeat(self):
+        if await self.heartbeat_in_cache():
+            return
+
+        # The reaper already expired this connection (e.g. a long GC pause); register it again.
+        connection_count = await self.add_user_to_cache()
+        if connection_count == 1:
+            self.announce("online")
+
     async def chat_message_update(self, event):
         if self.user.id != event.get("receiver_id"):
             return
@@ -119,74 +132,62 @@ class PresenceConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def add_user_to_cache(self):
-        from realtime.utils import add_online_user
-        add_online_user(self.workspace_id, self.user.id)
+        return presence_store.connect(self.workspace_id, self.user.id, self.channel_name)
 
     @database_sync_to_async
     def remove_user_from_cache(self):
-        from realtime.utils import remove_online_user
-        remove_online_user(self.workspace_id, self.user.id)
+        return presence_store.disconnect(self.workspace_id, self.user.id, self.channel_name)
+
+    @database_sync_to_async
+    def heartbeat_in_cache(self):
+        return presence_store.heartbeat(self.workspace_id, self.user.id, self.channel_name)
 
     @database_sync_to_async
     def check_user_online(self, user_id):
-        from realtime.utils import is_user_online_in_workspace
-        return is_user_online_in_workspace(self.workspace_id, user_id)
+        return presence_store.is_user_online(self.workspace_id, user_id)
 
     @database_sync_to_async
     def get_unread_summary_with_last_message(self):
-        messages = ChatMessage.objects.filter(
-            workspace_id=self.workspace_id
-        ).filter(
-            Q(sender=self.user) | Q(receiver=self.user)
-        ).select_related('sender', 'receiver').order_by('-timestamp')
-
-        latest_msgs = {}
-
-        for msg in messages:
-            if msg.sender == self.user:
-                other = msg.receiver
-                from_self = True
-            else:
-                other = msg.sender
-                from_self = False
-
-            if other.id not in latest_msgs:
-                latest_msgs[other.id] = {
-                    'user_id': other.id,
-                    'username': getattr(other, 'first_name', '') or getattr(other, 'username', ''),
-                    'message': msg.text,
-                    'timestamp': msg.timestamp.isoformat(),
-                    'from_self': from_self,
-                }
-
-        unread_qs = ChatMessage.objects.filter(
-            receiver=self.user,
+        conversations = Conversation.objects.filter(
             workspace_id=self.workspace_id,
-            is_read=False
-        ).values('sender_id').annotate(total=Count('id'))
-
-        unread_count = {row['sender_id']: row['total'] for row in unread_qs}
+            last_message__isnull=False,
+        ).filter(
+            Q(user_a=self.user) | Q(user_b=self.user)
+        ).select_related('user_a', 'user_b', 'last_message').order_by('-last_message_at')
 
         result = []
-        for user_id, msg_data in latest_msgs.items():
-            msg_data['unread_count'] = unread_count.get(user_id, 0)
-            result.append(msg_data)
-
-        result.sort(key=lambda x: x['timestamp'], reverse=True)
+        for conversation in conversations:
+            if conversation.user_a_id == self.user.id:
+                other, unread_count = conversation.user_b, conversation.unread_a
+            else:
+                other, unread_count = conversation.user_a, conversation.unread_b
+
+            msg = conversation.last_message
+            result.append({
+                'user_id': other.id,
+                'username': getattr(other, 'first_name', '') or getattr(other, 'username', ''),
+                'message': msg.text,
+                'timestamp': msg.timestamp.isoformat(),
+                'from_self': msg.sender_id == self.user.id,
+                'unread_count': unread_count,
+            })
 
         return result
 
     @database_sync_to_async
     def mark_messages_as_read(self, sender_id):
-        updated_count = ChatMessage.objects.filter(
-            sender_id=sender_id,
-            receiver=self.user,
-            workspace_id=self.workspace_id,
-            is_read=False
-        ).update(is_read=True)
+        # Subtract exactly what was marked: a message saved after the UPDATE stays unread.
+        with transaction.atomic():
+            updated_count = ChatMessage.objects.filter(
+                sender_id=sender_id,
+                receiver=self.user,
+                workspace_id=self.workspace_id,
+                is_read=False
+            ).update(is_read=True)
+            if updated_count:
+                Conversation.mark_read(self.workspace_id, self.user.id, int(sender_id), count=updated_count)
         return updated_count
     
     @database_sync_to_async
     def get_online_users_in_workspace(self):
-        from realtime.utils import get_online_users_in_workspace
-        return get_online_users_in_workspace(self.workspace_id)
+        return presence_store.online_users(self.workspace_id)
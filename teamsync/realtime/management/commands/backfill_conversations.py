@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db.models.functions import Greatest, Least
+from realtime.models import ChatMessage, Conversation
+
+
+class Command(BaseCommand):
+    help = "Rebuild Conversation summary rows from existing chat messages."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workspace", type=int, help="Only rebuild conversations in this workspace.")
+
+    def handle(self, *args, **options):
+        messages = ChatMessage.objects.all()
+        if options["workspace"]:
+            messages = messages.filter(workspace_id=options["workspace"])
+
+        pairs = messages.annotate(
+            user_a=Least("sender", "receiver"),
+            user_b=Greatest("sender", "receiver"),
+        ).values_list("workspace_id", "user_a", "user_b").order_by().distinct()
+
+        count = 0
+        for workspace_id, user_a, user_b in pairs.iterator():
+            Conversation.rebuild(workspace_id, user_a, user_b)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} conversations."))
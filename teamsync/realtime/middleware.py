@@ -1,19 +1,14 @@
 # realtime/middleware.py
 from django.contrib.auth.models import AnonymousUser
-from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.tokens import AccessToken, BlacklistedToken
 from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware
+from accounts.authentication import get_user_from_access_token
 
-User = get_user_model()
 
 @database_sync_to_async
 def get_user_from_token(token_str):
     try:
-        token = AccessToken(token_str)
-        user = User.objects.get(id=token["user_id"])
-        if BlacklistedToken.objects.filter(token__jti=token["jti"]).exists():
-            return None
+        user, _ = get_user_from_access_token(token_str)
         return user
     except Exception:
         return None
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Greatest, Least
 from accounts.models import Accounts
 from workspace.models import Workspace
 import uuid
@@ -11,9 +13,50 @@ class Notification(models.Model):
     message = models.TextField()
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', 'is_read', 'created_at']),
+            models.Index(fields=['recipient', '-id']),
+        ]
+
     def __str__(self):
         return f"{self.recipient} - {self.message[:50]}"
+
+
+class NotificationCounter(models.Model):
+    """Unread notification count per user, kept in step with Notification writes."""
+    user = models.OneToOneField(Accounts, on_delete=models.CASCADE, related_name='notification_counter')
+    unread = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def get_unread(cls, user_id):
+        counter = cls.objects.filter(user_id=user_id).values_list('unread', flat=True).first()
+        if counter is None:
+            return cls.rebuild(user_id)
+        return counter
+
+    @classmethod
+    def rebuild(cls, user_id):
+        unread = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+        cls.objects.update_or_create(user_id=user_id, defaults={'unread': unread})
+        return unread
+
+    @classmethod
+    def add(cls, notifications):
+        """Count freshly created unread notifications, e.g. after bulk_create."""
+        counts = {}
+        for notification in notifications:
+            if not notification.is_read:
+                counts[notification.recipient_id] = counts.get(notification.recipient_id, 0) + 1
+
+        for user_id, count in counts.items():
+            # Users without a row are counted lazily by get_unread.
+            cls.objects.filter(user_id=user_id).update(unread=F('unread') + count)
+
+    @classmethod
+    def remove(cls, user_id, count):
+        cls.objects.filter(user_id=user_id).update(unread=Greatest(F('unread') - count, 0))
     
 
 class ChatMessage(models.Model):
@@ -27,6 +70,27 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['-timestamp']    
+        indexes = [
+            models.Index(
+                F("workspace"),
+                Least("sender", "receiver"),
+                Greatest("sender", "receiver"),
+                F("timestamp"),
+                name="chat_conversation_ts_idx",
+            ),
+        ]
+
+    @classmethod
+    def conversation(cls, workspace_id, user_id, other_id):
+        # Filter on the same LEAST/GREATEST expressions as chat_conversation_ts_idx so it is used.
+        return cls.objects.annotate(
+            user_a=Least("sender", "receiver"),
+            user_b=Greatest("sender", "receiver"),
+        ).filter(
+            workspace_id=workspace_id,
+            user_a=min(user_id, other_id),
+            user_b=max(user_id, other_id),
+        )
 
 
 class Meeting(models.Model):
@@ -44,3 +108,76 @@ class Meeting(models.Model):
         if self.actual_start_time and self.end_time:
             return (self.end_time - self.actual_start_time).total_seconds() / 60
         return None
+
+
+class Conversation(models.Model):
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name='conversations')
+    user_a = models.ForeignKey(Accounts, on_delete=models.CASCADE, related_name='+')
+    user_b = models.ForeignKey(Accounts, on_delete=models.CASCADE, related_name='+')
+    last_message = models.ForeignKey(ChatMessage, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    unread_a = models.PositiveIntegerField(default=0)
+    unread_b = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('workspace', 'user_a', 'user_b')
+        indexes = [
+            models.Index(fields=['workspace', 'user_a', '-last_message_at']),
+            models.Index(fields=['workspace', 'user_b', '-last_message_at']),
+        ]
+
+    @staticmethod
+    def key(workspace_id, user_id, other_id):
+        return {
+            "workspace_id": workspace_id,
+            "user_a_id": min(user_id, other_id),
+            "user_b_id": max(user_id, other_id),
+        }
+
+    @staticmethod
+    def unread_field(reader_id, other_id):
+        return "unread_a" if reader_id < other_id else "unread_b"
+
+    @classmethod
+    def record_message(cls, message):
+        key = cls.key(message.workspace_id, message.sender_id, message.receiver_id)
+        unread = cls.unread_field(message.receiver_id, message.sender_id)
+
+        conversation, _ = cls.objects.get_or_create(**key)
+        cls.objects.filter(pk=conversation.pk).update(
+            last_message=message,
+            last_message_at=message.timestamp,
+            **{unread: F(unread) + 1},
+        )
+
+    @classmethod
+    def mark_read(cls, workspace_id, reader_id, other_id, count=None):
+        # count=None means every message from other_id is now read.
+        unread = cls.unread_field(reader_id, other_id)
+        value = 0 if count is None else Greatest(F(unread) - count, 0)
+        cls.objects.filter(**cls.key(workspace_id, reader_id, other_id)).update(**{unread: value})
+
+    @classmethod
+    def rebuild(cls, workspace_id, user_id, other_id):
+        messages = ChatMessage.conversation(workspace_id, user_id, other_id)
+        last = messages.order_by('-timestamp', '-id').first()
+        if last is None:
+            cls.objects.filter(**cls.key(workspace_id, user_id, other_id)).delete()
+            return
+
+        unread = dict(
+            messages.filter(is_read=False).values_list('receiver_id').annotate(total=models.Count('id'))
+        )
+        low, high = min(user_id, other_id), max(user_id, other_id)
+        cls.objects.update_or_create(
+            **cls.key(workspace_id, user_id, other_id),
+            defaults={
+                "last_message": last,
+                "last_message_at": last.timestamp,
+                "unread_a": unread.get(low, 0),
+                "unread_b": unread.get(high, 0),
+            },
+        )
+
+    def __str__(self):
+        return f"{self.user_a_id} <-> {self.user_b_id} in {self.workspace_id}"
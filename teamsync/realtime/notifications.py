@@ -0,0 +1,59 @@
+import asyncio
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from realtime.models import Notification, NotificationCounter
+
+
+def notify(items):
+    """
+    Create notifications for a batch of (recipient_id, workspace, message) with one INSERT.
+    The websocket push is queued on a Celery worker after commit, so callers never wait on Redis.
+    """
+    notifications = [
+        Notification(recipient_id=recipient_id, workspace=workspace, message=message)
+        for recipient_id, workspace, message in items
+    ]
+    if not notifications:
+        return []
+
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create(notifications)
+        NotificationCounter.add(notifications)
+
+        ids = [n.id for n in notifications]
+        transaction.on_commit(lambda: enqueue_push(ids))
+
+    return notifications
+
+
+def enqueue_push(notification_ids):
+    from realtime.tasks import push_notifications
+
+    push_notifications.delay(notification_ids)
+
+
+def push(notifications):
+    """Send all notifications to their recipients' groups concurrently on one event loop."""
+    channel_layer = get_channel_layer()
+
+    async def fan_out():
+        await asyncio.gather(*[
+            channel_layer.group_send(
+                f"workspace_{n.workspace_id}_user_{n.recipient_id}",
+                {
+                    "type": "send_notification",
+                    "content": {
+                        "id": n.id,
+                        "message": n.message,
+                        "workspace": {
+                            "id": n.workspace.id,
+                            "name": n.workspace.name,
+                        },
+                    }
+                }
+            )
+            for n in notifications
+        ])
+
+    async_to_sync(fan_out)()
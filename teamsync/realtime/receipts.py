@@ -0,0 +1,110 @@
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+from realtime.models import ChatMessage, Conversation
+from realtime.utils import KeyedCoalescer
+
+
+@database_sync_to_async
+def apply_receipts(workspace_id, reader_id, sender_id, delivered_ids, read_ids):
+    """Apply a batch of acks with at most one UPDATE per kind; returns the number of reads applied."""
+    read_count = 0
+    with transaction.atomic():
+        if read_ids:
+            read_count = ChatMessage.objects.filter(
+                id__in=read_ids,
+                sender_id=sender_id,
+                receiver_id=reader_id,
+                workspace_id=workspace_id,
+                is_read=False,
+            ).update(is_read=True, is_delivered=True)
+            if read_count:
+                Conversation.mark_read(workspace_id, reader_id, sender_id, count=read_count)
+
+        delivered_only = delivered_ids - read_ids
+        if delivered_only:
+            ChatMessage.objects.filter(
+                id__in=delivered_only,
+                sender_id=sender_id,
+                receiver_id=reader_id,
+                workspace_id=workspace_id,
+                is_delivered=False,
+            ).update(is_delivered=True)
+
+    return read_count
+
+
+class ReceiptAggregator(KeyedCoalescer):
+    """Coalesces delivery/read acks per conversation and flushes them once per window."""
+
+    def __init__(self, window_ms=None):
+        super().__init__(window_ms or getattr(settings, "CHAT_RECEIPT_WINDOW_MS", 150))
+
+    def push(self, channel_layer, room_group_name, workspace_id, reader_id, sender_id, delivered=(), read=()):
+        key = (room_group_name, reader_id)
+        batch = self.pending.setdefault(key, {
+            "workspace_id": workspace_id,
+            "sender_id": sender_id,
+            "delivered": set(),
+            "read": set(),
+        })
+        batch["delivered"].update(delivered)
+        batch["read"].update(read)
+        # New ids in a batch waiting for a retry still need their UPDATE.
+        batch.pop("applied", None)
+        self.schedule(channel_layer, key)
+
+    def restore(self, batch, newer):
+        # Newer ids still need their UPDATE; re-running it for the applied ones is a no-op.
+        return {
+            **newer,
+            "delivered": batch["delivered"] | newer["delivered"],
+            "read": batch["read"] | newer["read"],
+            "read_count": batch.get("read_count", 0),
+        }
+
+    async def flush(self, channel_layer, key, batch):
+        room_group_name, reader_id = key
+        workspace_id, sender_id = batch["workspace_id"], batch["sender_id"]
+
+        # A retry after a failed broadcast must not lose the reads applied the first time.
+        if not batch.get("applied"):
+            batch["read_count"] = batch.get("read_count", 0) + await apply_receipts(
+                workspace_id, reader_id, sender_id, batch["delivered"], batch["read"]
+            )
+            batch["applied"] = True
+        read_count = batch["read_count"]
+
+        await channel_layer.group_send(
+            room_group_name,
+            {
+                "type": "receipt_event",
+                "room": room_group_name,
+                "reader_id": reader_id,
+                "delivered_ids": sorted(batch["delivered"] | batch["read"]),
+                "read_ids": sorted(batch["read"]),
+            }
+        )
+
+        await channel_layer.group_send(
+            f"presence_workspace_{workspace_id}",
+            {
+                "type": "presence_read_update",
+                "reader_id": reader_id,
+                "receiver_id": sender_id,
+                "workspace_id": workspace_id,
+            }
+        )
+
+        if read_count:
+            for user_id in (reader_id, sender_id):
+                await channel_layer.group_send(
+                    f"user_{user_id}",
+                    {
+                        "type": "chat_message_update",
+                        "receiver_id": user_id,
+                    }
+                )
+
+
+receipt_aggregator = ReceiptAggregator()
@@ -3,6 +3,7 @@ from .consumers.notification_consumer import NotificationConsumer
 from .consumers.chat_consumer import ChatConsumer
 from .consumers.presence_consumer import PresenceConsumer
 from .consumers.video_call_consumer import VideoCallConsumer
+from .consumers.multiplex_consumer import MultiplexConsumer
 
 websocket_urlpatterns = [
 
@@ -10,5 +11,6 @@ websocket_urlpatterns = [
       re_path(r'ws/chat/(?P<workspace_id>\d+)/(?P<receiver_id>\d+)/$', ChatConsumer.as_asgi()),
       re_path(r"ws/online/(?P<workspace_id>\d+)/?$", PresenceConsumer.as_asgi()),
       re_path(r'ws/video-call/$', VideoCallConsumer.as_asgi()),
+      re_path(r'ws/multiplex/$', MultiplexConsumer.as_asgi()),
       
 ]
\ No newline at end of file
@@ -0,0 +1,32 @@
+from asgiref.sync import async_to_sync
+from celery import shared_task
+from channels.layers import get_channel_layer
+from realtime.models import Notification
+from realtime.notifications import push
+from realtime.utils import presence_store, presence_diff_event
+
+
+@shared_task
+def reap_stale_presence():
+    """Expire connections whose worker stopped heartbeating and announce them per workspace."""
+    offline_by_workspace = presence_store.reap()
+    if not offline_by_workspace:
+        return 0
+
+    channel_layer = get_channel_layer()
+    for workspace_id, user_ids in offline_by_workspace.items():
+        async_to_sync(channel_layer.group_send)(
+            f"presence_workspace_{workspace_id}",
+            presence_diff_event(offline=user_ids),
+        )
+
+    return sum(len(user_ids) for user_ids in offline_by_workspace.values())
+
+
+@shared_task
+def push_notifications(notification_ids):
+    notifications = list(
+        Notification.objects.filter(id__in=notification_ids).select_related("workspace")
+    )
+    push(notifications)
+    return len(notifications)
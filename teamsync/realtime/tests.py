@@ -1,3 +1,57 @@
-from django.test import TestCase
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from accounts.models import Accounts
+from workspace.models import Workspace
+from .consumers.multiplex_consumer import MultiplexConsumer
+from .models import ChatMessage
 
 # Create your tests here.
+
+
+def with_user(application, user):
+    async def app(scope, receive, send):
+        return await application({**scope, "user": user}, receive, send)
+    return app
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class MultiplexReadReceiptTests(TransactionTestCase):
+    def setUp(self):
+        self.reader = Accounts.objects.create_user(email="reader@example.com", password="pass")
+        self.sender = Accounts.objects.create_user(email="sender@example.com", password="pass")
+        self.workspace = Workspace.objects.create(name="Acme", owner=self.reader)
+
+    def test_rest_read_receipt_reaches_multiplexed_chat_stream(self):
+        async def scenario():
+            socket = WebsocketCommunicator(with_user(MultiplexConsumer.as_asgi(), self.sender), "/ws/multiplex/")
+            connected, _ = await socket.connect()
+            self.assertTrue(connected)
+
+            await socket.send_json_to({
+                "stream": "chat",
+                "action": "join",
+                "params": {"workspace_id": self.workspace.id, "receiver_id": self.reader.id},
+            })
+            while not await socket.receive_nothing(0.2):
+                await socket.receive_json_from()
+
+            message = await sync_to_async(ChatMessage.objects.create)(
+                sender=self.sender, receiver=self.reader, workspace=self.workspace, text="hi",
+            )
+
+            client = APIClient()
+            client.force_authenticate(self.reader)
+            response = await sync_to_async(client.get)(
+                f"/api/v1/realtime/{self.workspace.id}/{self.sender.id}/messages/"
+            )
+            self.assertEqual(response.status_code, 200)
+
+            frame = await socket.receive_json_from(timeout=1)
+            self.assertEqual(frame["stream"], "chat")
+            self.assertEqual(frame["key"], f"{self.workspace.id}:{self.reader.id}")
+            self.assertEqual(frame["payload"]["message_ids"], [message.id])
+            await socket.disconnect()
+
+        async_to_sync(scenario)()
@@ -1,24 +1,255 @@
-from django.core.cache import cache
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from django.conf import settings
+from django_redis import get_redis_connection
 
-def add_online_user(workspace_id, user_id):
-    key = f"workspace_{workspace_id}_online_users"
-    online_users = set(cache.get(key, []))
-    online_users.add(user_id)
-    cache.set(key, list(online_users), timeout=None)
+logger = logging.getLogger(__name__)
 
-def remove_online_user(workspace_id, user_id):
-    key = f"workspace_{workspace_id}_online_users"
-    online_users = set(cache.get(key, []))
-    online_users.discard(user_id)
-    cache.set(key, list(online_users), timeout=None)
+
+# Each workspace keeps three keys:
+#   users        SET   user ids with at least one live connection
+#   connections  HASH  user id -> number of live connections (tabs)
+#   heartbeats   ZSET  "user_id:connection_id" -> last heartbeat timestamp
+# plus one global SET of workspaces with live connections, walked by the reaper.
+# All mutations run as Lua scripts, so concurrent connects/disconnects never lose updates.
+
+WORKSPACES_KEY = "presence:workspaces"
+
+CONNECT_SCRIPT = """
+redis.call('HINCRBY', KEYS[2], ARGV[1], 1)
+redis.call('SADD', KEYS[1], ARGV[1])
+redis.call('ZADD', KEYS[3], ARGV[3], ARGV[1] .. ':' .. ARGV[2])
+redis.call('SADD', KEYS[4], ARGV[4])
+return redis.call('HGET', KEYS[2], ARGV[1])
+"""
+
+DISCONNECT_SCRIPT = """
+if redis.call('ZREM', KEYS[3], ARGV[1] .. ':' .. ARGV[2]) == 0 then
+    return -1
+end
+local count = redis.call('HINCRBY', KEYS[2], ARGV[1], -1)
+if count <= 0 then
+    redis.call('HDEL', KEYS[2], ARGV[1])
+    redis.call('SREM', KEYS[1], ARGV[1])
+    return 0
+end
+return count
+"""
+
+HEARTBEAT_SCRIPT = """
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+EXPIRE_SCRIPT = """
+local stale = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', ARGV[1])
+local offline = {}
+for _, member in ipairs(stale) do
+    redis.call('ZREM', KEYS[3], member)
+    local user_id = string.match(member, '^([^:]+):')
+    local count = redis.call('HINCRBY', KEYS[2], user_id, -1)
+    if count <= 0 then
+        redis.call('HDEL', KEYS[2], user_id)
+        redis.call('SREM', KEYS[1], user_id)
+        table.insert(offline, user_id)
+    end
+end
+if redis.call('ZCARD', KEYS[3]) == 0 then
+    redis.call('SREM', KEYS[4], ARGV[2])
+end
+return offline
+"""
+
+
+class PresenceStore:
+    """Connection-counted presence per workspace, backed by native Redis types."""
+
+    heartbeat_interval = 30
+    heartbeat_ttl = 90
+
+    def __init__(self, alias="default"):
+        self.alias = alias
+        self._client = None
+        self._scripts = {}
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_redis_connection(self.alias)
+        return self._client
+
+    def script(self, source):
+        if source not in self._scripts:
+            self._scripts[source] = self.client.register_script(source)
+        return self._scripts[source]
+
+    def keys(self, workspace_id):
+        prefix = f"presence:workspace:{workspace_id}"
+        return [f"{prefix}:users", f"{prefix}:connections", f"{prefix}:heartbeats"]
+
+    def connect(self, workspace_id, user_id, connection_id):
+        """Register a connection; returns the user's live connection count."""
+        count = self.script(CONNECT_SCRIPT)(
+            keys=self.keys(workspace_id) + [WORKSPACES_KEY],
+            args=[user_id, connection_id, time.time(), workspace_id],
+        )
+        return int(count)
+
+    def disconnect(self, workspace_id, user_id, connection_id):
+        """Drop a connection; returns the remaining count (0 means the user went offline)."""
+        count = self.script(DISCONNECT_SCRIPT)(
+            keys=self.keys(workspace_id),
+            args=[user_id, connection_id],
+        )
+        return int(count)
+
+    def heartbeat(self, workspace_id, user_id, connection_id):
+        """Refresh a connection; returns False if it was already expired."""
+        refreshed = self.script(HEARTBEAT_SCRIPT)(
+            keys=self.keys(workspace_id)[2:],
+            args=[f"{user_id}:{connection_id}", time.time()],
+        )
+        return bool(refreshed)
+
+    def expire_stale(self, workspace_id, ttl=None):
+        """Drop connections that missed their heartbeats; returns user ids now offline."""
+        cutoff = time.time() - (ttl or self.heartbeat_ttl)
+        offline = self.script(EXPIRE_SCRIPT)(
+            keys=self.keys(workspace_id) + [WORKSPACES_KEY],
+            args=[cutoff, workspace_id],
+        )
+        return [int(user_id) for user_id in offline]
+
+    def reap(self, ttl=None):
+        """Expire stale connections in every active workspace; returns {workspace_id: [user ids]}."""
+        offline_by_workspace = {}
+        for workspace_id in self.client.smembers(WORKSPACES_KEY):
+            workspace_id = int(workspace_id)
+            offline = self.expire_stale(workspace_id, ttl)
+            if offline:
+                offline_by_workspace[workspace_id] = offline
+        return offline_by_workspace
+
+    def is_user_online(self, workspace_id, user_id):
+        users_key = self.keys(workspace_id)[0]
+        return bool(self.client.sismember(users_key, user_id))
+
+    def online_users(self, workspace_id):
+        users_key = self.keys(workspace_id)[0]
+        return [int(user_id) for user_id in self.client.smembers(users_key)]
+
+
+presence_store = PresenceStore()
+
+
+class KeyedCoalescer(ABC):
+    """
+    Collects pushes per key and flushes each key's batch once per window.
+
+    Subclasses merge pushes into self.pending, call schedule(), and implement flush() and
+    restore(). A failed flush is merged back and retried with exponential backoff; after
+    max_attempts failures in a row the batch is dropped with one error log.
+    """
+
+    max_attempts = 5
+
+    def __init__(self, delay_ms):
+        self.delay = delay_ms / 1000
+        self.pending = {}
+        self.timers = {}
+        self.failures = {}
+
+    def schedule(self, channel_layer, key):
+        if key not in self.timers:
+            delay = self.delay * 2 ** self.failures.get(key, 0)
+            self.timers[key] = asyncio.ensure_future(self.flush_later(channel_layer, key, delay))
+
+    async def flush_later(self, channel_layer, key, delay):
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.timers.pop(key, None)
+
+        batch = self.pending.pop(key, None)
+        if not batch:
+            return
+        try:
+            await self.flush(channel_layer, key, batch)
+        except Exception as error:
+            failures = self.failures.get(key, 0) + 1
+            if failures >= self.max_attempts:
+                self.failures.pop(key, None)
+                logger.error(
+                    "%s dropped the batch for %r after %d failed flushes",
+                    type(self).__name__, key, failures, exc_info=True,
+                )
+                return
+            self.failures[key] = failures
+            logger.warning("%s flush for %r failed (attempt %d): %s", type(self).__name__, key, failures, error)
+            newer = self.pending.get(key)
+            self.pending[key] = self.restore(batch, newer) if newer else batch
+            self.schedule(channel_layer, key)
+        else:
+            self.failures.pop(key, None)
+
+    @abstractmethod
+    async def flush(self, channel_layer, key, batch):
+        """Send one key's batch."""
+
+    @abstractmethod
+    def restore(self, batch, newer):
+        """Merge a failed batch with pushes that arrived meanwhile; newer pushes win."""
+
+
+class PresenceDebouncer(KeyedCoalescer):
+    """Coalesces status changes per workspace into one presence_diff group event per window."""
+
+    def __init__(self, delay_ms=None):
+        super().__init__(delay_ms or getattr(settings, "PRESENCE_DEBOUNCE_MS", 250))
+
+    def push(self, channel_layer, workspace_id, user_id, status):
+        # Last change wins, so a quick reconnect inside one window is sent once.
+        self.pending.setdefault(workspace_id, {})[user_id] = status
+        self.schedule(channel_layer, workspace_id)
+
+    async def flush(self, channel_layer, workspace_id, changes):
+        await channel_layer.group_send(
+            f"presence_workspace_{workspace_id}",
+            presence_diff_event(
+                online=[uid for uid, status in changes.items() if status == "online"],
+                offline=[uid for uid, status in changes.items() if status == "offline"],
+            ),
+        )
+
+    def restore(self, changes, newer):
+        return {**changes, **newer}
+
+
+presence_debouncer = PresenceDebouncer()
+
+
+def presence_diff_event(online=(), offline=()):
+    return {
+        "type": "presence_diff",
+        "online": list(online),
+        "offline": list(offline),
+    }
+
+
+def add_online_user(workspace_id, user_id, connection_id):
+    return presence_store.connect(workspace_id, user_id, connection_id)
+
+def remove_online_user(workspace_id, user_id, connection_id):
+    return presence_store.disconnect(workspace_id, user_id, connection_id)
 
 def is_user_online_in_workspace(workspace_id, user_id):
-    key = f"workspace_{workspace_id}_online_users" 
-    online_users = cache.get(key, [])
-    print(f"🟡 Checking {user_id} in {key}: {online_users}")
-    return str(user_id) in map(str, online_users)
+    return presence_store.is_user_online(workspace_id, user_id)
 
 
 def get_online_users_in_workspace(workspace_id):
-    key = f"workspace_{workspace_id}_online_users"
-    return cache.get(key, [])
+    return presence_store.online_users(workspace_id)
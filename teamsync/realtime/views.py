@@ -5,10 +5,11 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
-from .models import ChatMessage, Meeting
+from .models import ChatMessage, Meeting, Conversation
 from .serializers import ChatMessageSerializer, MeetingSerializer, MeetingListSerializer
 from workspace.models import Workspace
 from project.models import Project
+from django.db import transaction
 from django.db.models import Q
 from accounts.tasks import send_meeting_notification
 from datetime import timedelta
@@ -46,7 +47,13 @@ class ChatMessageListView(ListAPIView):
 
         unread = messages.filter(receiver=user, is_read=False)
         self.unread_message_ids = list(unread.values_list('id', flat=True))
-        unread.update(is_read=True)
+        if self.unread_message_ids:
+            with transaction.atomic():
+                # Only the listed ids: a message saved meanwhile stays unread and counted.
+                updated_count = ChatMessage.objects.filter(
+                    id__in=self.unread_message_ids, is_read=False
+                ).update(is_read=True)
+                Conversation.mark_read(self.workspace_id, user.id, self.receiver_id, count=updated_count)
 
         return messages
 
@@ -64,6 +71,7 @@ class ChatMessageListView(ListAPIView):
             f"chat_{room_name}",
             {
                 "type": "read_update_event",
+                "room": f"chat_{room_name}",
                 "reader_id": self.request.user.id,
                 "message_ids": self.unread_message_ids,
             }
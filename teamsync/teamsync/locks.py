@@ -0,0 +1,55 @@
+import uuid
+from django_redis import get_redis_connection
+
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLock:
+    """
+    Expiring Redis lock that holds a random token.
+
+    renew() and release() only act while the token still matches, so a holder that overran
+    its ttl can never extend or delete the lock of whoever took it next.
+    """
+
+    def __init__(self, key, ttl, alias="default", client=None):
+        self.key = key
+        self.ttl = ttl
+        self.alias = alias
+        self.token = None
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_redis_connection(self.alias)
+        return self._client
+
+    def acquire(self):
+        token = uuid.uuid4().hex
+        if self.client.set(self.key, token, nx=True, ex=self.ttl):
+            self.token = token
+            return True
+        return False
+
+    def renew(self):
+        if self.token is None:
+            return False
+        return bool(self.client.eval(RENEW_SCRIPT, 1, self.key, self.token, self.ttl))
+
+    def release(self):
+        if self.token is not None:
+            self.client.eval(RELEASE_SCRIPT, 1, self.key, self.token)
+            self.token = None
@@ -202,6 +202,29 @@ CELERY_BROKER_URL = "redis://localhost:6379/0"
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 
+CELERY_BEAT_SCHEDULE = {
+    "reap-stale-presence": {
+        "task": "realtime.tasks.reap_stale_presence",
+        "schedule": 30.0,
+    },
+    "drain-email-outbox": {
+        "task": "accounts.tasks.drain_email_outbox",
+        "schedule": 10.0,
+    },
+    "sweep-stripe-events": {
+        "task": "workspace.tasks.sweep_stripe_events",
+        "schedule": 60.0,
+    },
+    "sweep-plan-sync": {
+        "task": "adminpanel.tasks.sweep_plan_sync",
+        "schedule": 60.0,
+    },
+    "reconcile-project-stats": {
+        "task": "project.tasks.reconcile_project_stats",
+        "schedule": 60.0 * 60,
+    },
+}
+
 
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = "smtp.gmail.com"
@@ -0,0 +1,72 @@
+from contextlib import nullcontext
+import stripe
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from workspace.models import StripeEvent
+from workspace.stripe_events import load_events, process_customer_events, record_event
+from workspace.stripe_stub import StripeStub
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay Stripe webhook events through the inbox processor. Events come from JSON files "
+        "and/or stored events reset to pending; Stripe API calls go to a local stub unless --live."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="*", help="Event files (JSON list, API list response or JSON lines).")
+        parser.add_argument("--event-id", action="append", default=[], help="Re-run a stored event (repeatable).")
+        parser.add_argument("--failed", action="store_true", help="Re-run every stored event that ran out of attempts.")
+        parser.add_argument("--fixtures", action="append", default=[], help="Subscription/price/product objects to seed the stub with.")
+        parser.add_argument("--live", action="store_true", help="Call the real Stripe API instead of the stub.")
+
+    def handle(self, *args, **options):
+        recorded = duplicates = 0
+        customer_ids = set()
+        for path in options["files"]:
+            for event in load_events(path):
+                stripe_event, created = record_event(event, enqueue=False)
+                recorded += created
+                duplicates += not created
+                if stripe_event.status == "pending":
+                    customer_ids.add(stripe_event.customer_id)
+
+        rerun = StripeEvent.objects.none()
+        if options["event_id"]:
+            rerun = StripeEvent.objects.filter(event_id__in=options["event_id"])
+            missing = set(options["event_id"]) - set(rerun.values_list("event_id", flat=True))
+            if missing:
+                raise CommandError(f"Unknown event ids: {', '.join(sorted(missing))}")
+        if options["failed"]:
+            rerun = rerun | StripeEvent.objects.filter(status="failed")
+        customer_ids.update(rerun.values_list("customer_id", flat=True))
+        rerun.update(status="pending", attempts=0, error="", next_attempt_at=None, processed_at=None)
+
+        if not customer_ids:
+            self.stdout.write("Nothing to replay.")
+            return
+
+        if options["live"]:
+            stripe.api_key = settings.STRIPE_SECRET_KEY
+            context = nullcontext()
+        else:
+            stub = StripeStub()
+            for path in options["fixtures"]:
+                for obj in load_events(path):
+                    stub.add(obj)
+            pending = StripeEvent.objects.filter(customer_id__in=customer_ids, status="pending")
+            stub.add_from_events(pending.values_list("payload", flat=True))
+            context = stub.install()
+
+        processed = 0
+        with context:
+            for customer_id in sorted(customer_ids):
+                count, _ = process_customer_events(customer_id, max_attempts=1, due_only=False)
+                processed += count
+
+        failed = StripeEvent.objects.filter(customer_id__in=customer_ids, status="failed")
+        for stripe_event in failed:
+            self.stdout.write(self.style.ERROR(f"{stripe_event.event_id} {stripe_event.type}: {stripe_event.error}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Recorded {recorded} events ({duplicates} duplicates), processed {processed}, failed {failed.count()}."
+        ))
@@ -0,0 +1,30 @@
+import stripe
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from workspace.models import Workspace
+
+MIRROR_FIELDS = ["subscription_status", "subscription_cancel_at_period_end", "plan_expiry", "stripe_synced_at"]
+
+
+class Command(BaseCommand):
+    help = "Fill the local Stripe subscription mirror on Workspace from the Stripe API."
+
+    def handle(self, *args, **options):
+        stripe.api_key = settings.STRIPE_SECRET_KEY
+        workspaces = Workspace.objects.exclude(stripe_subscription_id__isnull=True).exclude(stripe_subscription_id="")
+
+        synced = failed = 0
+        for workspace in workspaces.iterator():
+            try:
+                subscription = stripe.Subscription.retrieve(workspace.stripe_subscription_id)
+            except stripe.error.InvalidRequestError:
+                workspace.subscription_status = "invalid_subscription"
+                workspace.save(update_fields=["subscription_status"])
+                failed += 1
+                continue
+
+            workspace.apply_stripe_subscription(subscription)
+            workspace.save(update_fields=MIRROR_FIELDS)
+            synced += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Synced {synced} subscriptions ({failed} invalid)."))
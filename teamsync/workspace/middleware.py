@@ -1,33 +1,73 @@
-from django.shortcuts import get_object_or_404
+from collections import OrderedDict
+from threading import Lock
+from django.utils.functional import SimpleLazyObject
 from workspace.models import Workspace
 from project.models import Project
-from django.urls import resolve
+
+
+class ProjectWorkspaceLRU:
+    """Small in-process project_id -> workspace_id map; projects never change workspace."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, project_id):
+        with self.lock:
+            workspace_id = self.entries.get(project_id)
+            if workspace_id is not None:
+                self.entries.move_to_end(project_id)
+            return workspace_id
+
+    def set(self, project_id, workspace_id):
+        with self.lock:
+            self.entries[project_id] = workspace_id
+            self.entries.move_to_end(project_id)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def discard(self, project_id):
+        with self.lock:
+            self.entries.pop(project_id, None)
+
+
+project_workspace_lru = ProjectWorkspaceLRU()
+
+
+def load_workspace(workspace_id=None, project_id=None):
+    if workspace_id:
+        return Workspace.objects.filter(id=workspace_id).first()
+
+    cached_id = project_workspace_lru.get(project_id)
+    if cached_id is not None:
+        return Workspace.objects.filter(id=cached_id).first()
+
+    project = Project.objects.select_related("workspace").filter(id=project_id).first()
+    if project is None:
+        return None
+
+    project_workspace_lru.set(project.id, project.workspace_id)
+    return project.workspace
+
+
+def lazy_workspace(workspace_id=None, project_id=None):
+    if not (workspace_id or project_id):
+        return None
+    return SimpleLazyObject(lambda: load_workspace(workspace_id, project_id))
+
 
 class WorkspaceMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        try:
-            resolver_match = resolve(request.path_info)
-            workspace_id = resolver_match.kwargs.get("workspace_id")
-            project_id = resolver_match.kwargs.get("project_id")
-
-            if workspace_id:
-                try:
-                    request.current_workspace = Workspace.objects.get(id=workspace_id)
-                except Workspace.DoesNotExist:
-                    request.current_workspace = None
-            elif project_id:
-                try:
-                    project = get_object_or_404(Project, id=project_id)
-                    request.current_workspace = project.workspace
-                except Project.DoesNotExist:
-                    request.current_workspace = None
-            else:
-                request.current_workspace = None  
-
-        except Exception as e:
-            request.current_workspace = None
-
-        return self.get_response(request)
\ No newline at end of file
+        request.current_workspace = None
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.current_workspace = lazy_workspace(
+            workspace_id=view_kwargs.get("workspace_id"),
+            project_id=view_kwargs.get("project_id"),
+        )
+        return None
@@ -1,7 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils.timezone import now
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 from adminpanel.models import Plan
 import uuid
 
@@ -40,6 +40,12 @@ class Workspace(models.Model):
     plan_expiry = models.DateTimeField(null=True, blank=True)  
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Local mirror of the Stripe subscription, kept current by StripeWebhookView.
+    subscription_status = models.CharField(max_length=32, default="no_subscription")
+    subscription_cancel_at_period_end = models.BooleanField(default=False)
+    last_invoice_status = models.CharField(max_length=32, null=True, blank=True)
+    stripe_synced_at = models.DateTimeField(null=True, blank=True)
+
     def save(self, *args, **kwargs):
         if self.plan and not self.plan_expiry:
             self.plan_expiry = now() + timedelta(days=self.plan.duration_days)
@@ -50,6 +56,19 @@ class Workspace(models.Model):
     def is_plan_active(self):
         return self.plan_expiry and self.plan_expiry > now()
 
+    def apply_stripe_subscription(self, subscription, event_created=None):
+        """Copy a Stripe subscription object onto the mirror; stale (older) events are ignored."""
+        synced_at = datetime.fromtimestamp(event_created, tz=timezone.utc) if event_created else now()
+        if self.stripe_synced_at and synced_at < self.stripe_synced_at:
+            return False
+
+        self.subscription_status = subscription.get("status") or self.subscription_status
+        self.subscription_cancel_at_period_end = bool(subscription.get("cancel_at_period_end"))
+        if subscription.get("current_period_end"):
+            self.plan_expiry = datetime.fromtimestamp(subscription["current_period_end"], tz=timezone.utc)
+        self.stripe_synced_at = synced_at
+        return True
+
     def deactivate_workspace(self):
         self.is_active = False
         self.save()
@@ -100,6 +119,9 @@ class WorkspaceInvitation(models.Model):
     token = models.UUIDField(default=uuid.uuid4, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        unique_together = ["workspace", "email"]
+
     def __str__(self):
         return f"Invite: {self.email} to {self.workspace.name} as {self.role}"
     
@@ -114,4 +136,35 @@ class CustomRole(models.Model):
         unique_together = ["workspace", "name"]
 
     def __str__(self):
-        return f"{self.name} - {self.workspace.name}"
\ No newline at end of file
+        return f"{self.name} - {self.workspace.name}"
+
+class StripeEvent(models.Model):
+    """Webhook inbox: every verified Stripe event is stored once and processed by a worker."""
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("processed", "Processed"),
+        ("failed", "Failed"),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    customer_id = models.CharField(max_length=255, blank=True, default="")
+    payload = models.JSONField()
+    created = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["customer_id", "status", "created", "id"]),
+        ]
+
+    def is_due(self):
+        return self.next_attempt_at is None or self.next_attempt_at <= now()
+
+    def __str__(self):
+        return f"{self.type} {self.event_id} ({self.status})"
@@ -0,0 +1,109 @@
+import logging
+import time
+import stripe
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+def plain(obj):
+    """StripeObject -> nested dicts/lists, so cache entries never pickle API client state."""
+    if isinstance(obj, dict):
+        return {key: plain(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [plain(value) for value in obj]
+    return obj
+
+
+class StripeAPI:
+    """The real Stripe client behind StripeCache; StripeStub offers the same retrieve()."""
+
+    def retrieve(self, resource, id):
+        return getattr(stripe, resource).retrieve(id)
+
+
+class StripeCache:
+    """
+    Read-through cache for the Stripe objects the billing page shows.
+
+    Prices and products are kept for STRIPE_CATALOG_CACHE_TTL. Subscriptions are fresh for
+    STRIPE_SUBSCRIPTION_FRESH_TTL; after that the stale copy is still served (up to
+    STRIPE_SUBSCRIPTION_STALE_TTL) while refresh_stripe_subscription fetches a new one.
+    Webhooks write subscriptions straight in through store_subscription().
+    """
+
+    def __init__(self, client=None):
+        self.client = client or StripeAPI()
+
+    @property
+    def catalog_ttl(self):
+        return getattr(settings, "STRIPE_CATALOG_CACHE_TTL", 60 * 60 * 24)
+
+    @property
+    def fresh_ttl(self):
+        return getattr(settings, "STRIPE_SUBSCRIPTION_FRESH_TTL", 60)
+
+    @property
+    def stale_ttl(self):
+        return getattr(settings, "STRIPE_SUBSCRIPTION_STALE_TTL", 60 * 60 * 24)
+
+    def key(self, resource, id):
+        return f"stripe:{resource.lower()}:{id}"
+
+    def get_catalog(self, resource, id):
+        key = self.key(resource, id)
+        obj = cache.get(key)
+        if obj is None:
+            obj = plain(self.client.retrieve(resource, id))
+            cache.set(key, obj, self.catalog_ttl)
+        return obj
+
+    def get_price(self, price_id):
+        return self.get_catalog("Price", price_id)
+
+    def get_product(self, product_id):
+        return self.get_catalog("Product", product_id)
+
+    def store_subscription(self, subscription):
+        subscription = plain(subscription)
+        cache.set(
+            self.key("Subscription", subscription["id"]),
+            {"data": subscription, "fresh_until": time.time() + self.fresh_ttl},
+            self.stale_ttl,
+        )
+        return subscription
+
+    def refresh_subscription(self, subscription_id):
+        try:
+            return self.store_subscription(self.client.retrieve("Subscription", subscription_id))
+        finally:
+            cache.delete(self.key("Subscription", subscription_id) + ":refreshing")
+
+    def get_subscription(self, subscription_id):
+        entry = cache.get(self.key("Subscription", subscription_id))
+        if entry is None:
+            return self.refresh_subscription(subscription_id)
+
+        if entry["fresh_until"] < time.time():
+            # One background refresh per subscription at a time; everyone else keeps the stale copy.
+            refreshing_key = self.key("Subscription", subscription_id) + ":refreshing"
+            if cache.add(refreshing_key, 1, 30):
+                from workspace.tasks import refresh_stripe_subscription
+
+                try:
+                    refresh_stripe_subscription.delay(subscription_id)
+                except Exception:
+                    cache.delete(refreshing_key)
+                    logger.exception("could not queue refresh of subscription %s", subscription_id)
+        return entry["data"]
+
+    def subscription_detail(self, subscription_id):
+        subscription = self.get_subscription(subscription_id)
+        item = subscription["items"]["data"][0]
+        price = self.get_price(item["price"]["id"])
+        product = self.get_product(price["product"])
+        return subscription, price, product
+
+
+stripe_cache = StripeCache()
@@ -0,0 +1,211 @@
+import json
+import logging
+from datetime import datetime, timedelta
+import stripe
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+from accounts.models import Accounts
+from adminpanel.models import Plan, Payment
+from workspace.models import StripeEvent, Workspace, WorkspaceMember
+from workspace.stripe_cache import stripe_cache
+from teamsync.locks import RedisLock
+
+logger = logging.getLogger(__name__)
+
+
+def event_customer_id(event):
+    customer = event["data"]["object"].get("customer") or ""
+    # Expanded objects carry the customer as a dict.
+    return customer.get("id", "") if isinstance(customer, dict) else customer
+
+
+def record_event(event, enqueue=True):
+    """Store a verified event in the inbox; returns (StripeEvent, created). Retried deliveries are not re-queued."""
+    stripe_event, created = StripeEvent.objects.get_or_create(
+        event_id=event["id"],
+        defaults={
+            "type": event.get("type", ""),
+            "customer_id": event_customer_id(event),
+            "payload": event,
+            "created": event.get("created") or 0,
+        },
+    )
+    if created and enqueue:
+        transaction.on_commit(lambda: enqueue_customer(stripe_event.customer_id))
+    return stripe_event, created
+
+
+def enqueue_customer(customer_id, countdown=None):
+    from workspace.tasks import process_stripe_events
+
+    try:
+        process_stripe_events.apply_async((customer_id,), countdown=countdown)
+    except Exception:
+        # The event is already stored; the sweep_stripe_events beat task picks it up.
+        logger.exception("could not enqueue stripe events for customer %r", customer_id)
+
+
+def handle_checkout_completed(session, event_created=None):
+    subscription_id = session.get("subscription")
+    customer_id = session.get("customer")
+    metadata = session.get("metadata", {})
+    action = metadata.get("action")
+
+    subscription = stripe_cache.store_subscription(stripe.Subscription.retrieve(subscription_id))
+    current_period_end = datetime.fromtimestamp(subscription["current_period_end"])
+    price_id = subscription["items"]["data"][0]["price"]["id"]
+    plan = Plan.objects.filter(stripe_price_id=price_id).first()
+
+    if action == "create":
+        # A second checkout event for the same subscription must not create a second workspace.
+        if Workspace.objects.filter(stripe_subscription_id=subscription_id).exists():
+            return
+
+        user = Accounts.objects.get(id=metadata.get("user_id"))
+        workspace = Workspace.objects.create(
+            name=metadata.get("workspace_name"),
+            owner=user,
+            workspace_type=metadata.get("workspace_type", "individual"),
+            work_type=metadata.get("work_type", "software_development"),
+            description=metadata.get("description", ""),
+            plan=plan,
+            plan_expiry=current_period_end,
+            is_active=True,
+            stripe_customer_id=customer_id,
+            stripe_subscription_id=subscription_id,
+            subscription_status=subscription["status"],
+        )
+        WorkspaceMember.objects.create(user=user, workspace=workspace, role="owner")
+
+    elif action == "update":
+        workspace = Workspace.objects.filter(id=metadata.get("workspace_id")).first()
+
+        if workspace and plan:
+            workspace.plan = plan
+            workspace.plan_expiry = current_period_end
+            workspace.stripe_subscription_id = subscription_id
+            workspace.stripe_customer_id = customer_id
+            workspace.is_active = True
+            workspace.apply_stripe_subscription(subscription)
+            workspace.save()
+
+
+def handle_subscription_updated(subscription, event_created=None):
+    workspace = Workspace.objects.filter(stripe_subscription_id=subscription.get("id")).first()
+
+    if workspace and workspace.apply_stripe_subscription(subscription, event_created):
+        workspace.save()
+        stripe_cache.store_subscription(subscription)
+
+
+def handle_subscription_deleted(subscription, event_created=None):
+    workspace = Workspace.objects.filter(stripe_subscription_id=subscription.get("id")).first()
+
+    if workspace:
+        if workspace.apply_stripe_subscription({**subscription, "status": "canceled"}, event_created):
+            stripe_cache.store_subscription({**subscription, "status": "canceled"})
+        workspace.deactivate_workspace()
+
+
+def handle_invoice_event(invoice, event_created=None):
+    subscription_id = invoice.get("subscription")
+    if not subscription_id:
+        return
+
+    Workspace.objects.filter(stripe_subscription_id=subscription_id).update(
+        last_invoice_status=invoice.get("status"),
+    )
+    if invoice.get("status") == "paid":
+        Payment.record_invoice(invoice)
+
+
+HANDLERS = {
+    "checkout.session.completed": handle_checkout_completed,
+    "customer.subscription.updated": handle_subscription_updated,
+    "customer.subscription.deleted": handle_subscription_deleted,
+}
+
+
+def process_event(stripe_event):
+    event_type = stripe_event.type
+    handler = HANDLERS.get(event_type)
+    if handler is None and event_type.startswith("invoice."):
+        handler = handle_invoice_event
+    if handler is None:
+        return
+
+    with transaction.atomic():
+        handler(stripe_event.payload["data"]["object"], stripe_event.created or None)
+
+
+def head_event(customer_id):
+    """The customer's oldest pending event; nothing behind it may run before it."""
+    return (
+        StripeEvent.objects.filter(customer_id=customer_id, status="pending")
+        .order_by("created", "id")
+        .first()
+    )
+
+
+def process_customer_events(customer_id, max_attempts=None, due_only=True):
+    """
+    Process a customer's pending events oldest first; returns (processed, retry_at).
+
+    Only one worker runs per customer (token lock). A failing event blocks the events behind
+    it until it succeeds or runs out of attempts, so handlers always see Stripe's order.
+    Failures back off exponentially via next_attempt_at; a head that is not due yet stops the
+    run. retry_at is the failed event's next_attempt_at when this run recorded a failure that
+    will be retried, else None.
+    """
+    max_attempts = max_attempts or getattr(settings, "STRIPE_EVENT_MAX_ATTEMPTS", 5)
+    retry_delay = getattr(settings, "STRIPE_EVENT_RETRY_DELAY", 30)
+    lock = RedisLock(f"stripe:events:{customer_id}:lock", ttl=300)
+    if not lock.acquire():
+        return 0, None
+
+    processed = 0
+    try:
+        while lock.renew():
+            stripe_event = head_event(customer_id)
+            if stripe_event is None or (due_only and not stripe_event.is_due()):
+                break
+
+            try:
+                process_event(stripe_event)
+            except Exception as error:
+                stripe_event.attempts += 1
+                stripe_event.error = str(error)
+                if stripe_event.attempts < max_attempts:
+                    stripe_event.next_attempt_at = now() + timedelta(seconds=retry_delay * 2 ** (stripe_event.attempts - 1))
+                    stripe_event.save(update_fields=["attempts", "error", "next_attempt_at"])
+                    logger.warning("stripe event %s failed (attempt %d): %s", stripe_event.event_id, stripe_event.attempts, error)
+                    return processed, stripe_event.next_attempt_at
+                stripe_event.status = "failed"
+                stripe_event.next_attempt_at = None
+                stripe_event.save(update_fields=["attempts", "error", "status", "next_attempt_at"])
+                logger.error("stripe event %s dropped after %d attempts: %s", stripe_event.event_id, stripe_event.attempts, error)
+                continue
+
+            stripe_event.status = "processed"
+            stripe_event.processed_at = now()
+            stripe_event.save(update_fields=["status", "processed_at"])
+            processed += 1
+    finally:
+        lock.release()
+
+    return processed, None
+
+
+def load_events(path):
+    """Read events from a JSON file: a list of events, {"data": [...]} as listed by the API, or one event per line."""
+    with open(path) as handle:
+        text = handle.read().strip()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    # Every event has a "data" key too; only an API list response wraps events in one.
+    if isinstance(data, dict):
+        return data["data"] if data.get("object") == "list" else [data]
+    return data
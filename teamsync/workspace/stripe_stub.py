@@ -0,0 +1,62 @@
+from contextlib import contextmanager
+import stripe
+
+
+class StripeStub:
+    """
+    In-memory stand-in for the Stripe retrieve calls the webhook handlers make.
+
+    Seed it with API objects (or let it pick them up from replayed events), then run code
+    inside install(), or pass it as the client of a StripeCache. Unknown ids raise
+    InvalidRequestError like the real API.
+    """
+
+    resources = {
+        "Subscription": "subscriptions",
+        "Price": "prices",
+        "Product": "products",
+    }
+
+    def __init__(self, subscriptions=(), prices=(), products=()):
+        self.subscriptions = {}
+        self.prices = {}
+        self.products = {}
+        self.calls = []
+        for obj in [*subscriptions, *prices, *products]:
+            self.add(obj)
+
+    def add(self, obj):
+        store = {"subscription": self.subscriptions, "price": self.prices, "product": self.products}.get(obj.get("object"))
+        if store is not None:
+            store[obj["id"]] = obj
+
+    def add_from_events(self, events):
+        """Remember the latest copy of every subscription, price and product the events carry."""
+        for event in sorted(events, key=lambda event: event.get("created") or 0):
+            self.add(event["data"]["object"])
+
+    def retrieve(self, resource, id):
+        self.calls.append((resource, id))
+        store = getattr(self, self.resources[resource])
+        if id not in store:
+            raise stripe.error.InvalidRequestError(f"No such {resource.lower()}: '{id}'", "id")
+        return store[id]
+
+    def retriever(self, resource):
+        return lambda id, **params: self.retrieve(resource, id)
+
+    @contextmanager
+    def install(self):
+        originals = {}
+        try:
+            for resource in self.resources:
+                cls = getattr(stripe, resource)
+                originals[cls] = cls.__dict__.get("retrieve")
+                setattr(cls, "retrieve", staticmethod(self.retriever(resource)))
+            yield self
+        finally:
+            for cls, original in originals.items():
+                if original is None:
+                    delattr(cls, "retrieve")
+                else:
+                    setattr(cls, "retrieve", original)
@@ -0,0 +1,47 @@
+from datetime import timedelta
+from celery import shared_task
+from django.utils.timezone import now
+from workspace.models import StripeEvent
+from workspace.stripe_cache import stripe_cache
+from workspace.stripe_events import enqueue_customer, head_event, process_customer_events
+
+
+@shared_task
+def process_stripe_events(customer_id):
+    """Work through one customer's webhook inbox in event order."""
+    processed, retry_at = process_customer_events(customer_id)
+    if retry_at is not None:
+        # Only the run that recorded the failure schedules its retry, so retries never fan out.
+        enqueue_customer(customer_id, countdown=max(1, (retry_at - now()).total_seconds()))
+        return processed
+
+    # An event stored while the lock was held found it taken; pick it up now.
+    head = head_event(customer_id)
+    if head is not None and head.is_due():
+        enqueue_customer(customer_id, countdown=1)
+    return processed
+
+
+@shared_task
+def sweep_stripe_events():
+    """Re-queue customers whose due events were stored but never picked up (e.g. broker outage)."""
+    cutoff = now() - timedelta(minutes=1)
+    customer_ids = list(
+        StripeEvent.objects.filter(status="pending", received_at__lt=cutoff)
+        .values_list("customer_id", flat=True)
+        .distinct()
+    )
+    queued = 0
+    for customer_id in customer_ids:
+        head = head_event(customer_id)
+        if head is not None and head.is_due():
+            enqueue_customer(customer_id)
+            queued += 1
+    return queued
+
+
+@shared_task
+def refresh_stripe_subscription(subscription_id):
+    """Background half of the stale-while-revalidate subscription cache."""
+    subscription = stripe_cache.refresh_subscription(subscription_id)
+    return subscription["status"]
@@ -1,3 +1,95 @@
-from django.test import TestCase
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from accounts.models import Accounts
+from .models import Workspace
+from .stripe_cache import StripeCache, stripe_cache
+from .stripe_stub import StripeStub
 
 # Create your tests here.
+
+
+def subscription(**fields):
+    return {
+        "id": "sub_1",
+        "object": "subscription",
+        "status": "active",
+        "current_period_start": 1700000000,
+        "current_period_end": 1702592000,
+        "cancel_at_period_end": False,
+        "items": {"data": [{"price": {"id": "price_1"}}]},
+        **fields,
+    }
+
+
+PRICE = {
+    "id": "price_1",
+    "object": "price",
+    "product": "prod_1",
+    "unit_amount": 900,
+    "currency": "usd",
+    "recurring": {"interval": "month", "interval_count": 1},
+}
+PRODUCT = {"id": "prod_1", "object": "product", "name": "Pro", "description": ""}
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class StripeCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.stub = StripeStub(subscriptions=[subscription()], prices=[PRICE], products=[PRODUCT])
+        self.stripe_cache = StripeCache(client=self.stub)
+
+    def test_price_and_product_are_fetched_once(self):
+        for _ in range(3):
+            self.stripe_cache.get_price("price_1")
+            self.stripe_cache.get_product("prod_1")
+        self.assertEqual(self.stub.calls, [("Price", "price_1"), ("Product", "prod_1")])
+
+    def test_miss_fetches_subscription_synchronously(self):
+        with mock.patch("workspace.tasks.refresh_stripe_subscription.delay") as delay:
+            data = self.stripe_cache.get_subscription("sub_1")
+        self.assertEqual(data["status"], "active")
+        self.assertEqual(self.stub.calls, [("Subscription", "sub_1")])
+        delay.assert_not_called()
+
+    def test_fresh_subscription_is_served_from_cache(self):
+        self.stripe_cache.store_subscription(subscription())
+        with mock.patch("workspace.tasks.refresh_stripe_subscription.delay") as delay:
+            data = self.stripe_cache.get_subscription("sub_1")
+        self.assertEqual(data["id"], "sub_1")
+        self.assertEqual(self.stub.calls, [])
+        delay.assert_not_called()
+
+    def test_stale_subscription_is_served_and_refreshed_once(self):
+        with override_settings(STRIPE_SUBSCRIPTION_FRESH_TTL=-1):
+            self.stripe_cache.store_subscription(subscription(status="past_due"))
+        with mock.patch("workspace.tasks.refresh_stripe_subscription.delay") as delay:
+            first = self.stripe_cache.get_subscription("sub_1")
+            second = self.stripe_cache.get_subscription("sub_1")
+        self.assertEqual((first["status"], second["status"]), ("past_due", "past_due"))
+        self.assertEqual(self.stub.calls, [])
+        delay.assert_called_once_with("sub_1")
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class CancelSubscriptionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = Accounts.objects.create_user(email="owner@example.com", password="pass")
+        Workspace.objects.create(name="Acme", owner=self.user, stripe_subscription_id="sub_1")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cancel_stores_updated_subscription(self):
+        stub = StripeStub(subscriptions=[subscription()])
+        stripe_cache.store_subscription(subscription())
+        with mock.patch.object(stripe_cache, "client", stub), \
+                mock.patch("stripe.Subscription.modify", return_value=subscription(cancel_at_period_end=True)) as modify:
+            response = self.client.post("/api/v1/workspace/cancel-subscription/", {"subscription_id": "sub_1"}, format="json")
+            data = stripe_cache.get_subscription("sub_1")
+        self.assertEqual(response.status_code, 200)
+        modify.assert_called_once_with("sub_1", cancel_at_period_end=True)
+        self.assertTrue(data["cancel_at_period_end"])
+        self.assertEqual(stub.calls, [])
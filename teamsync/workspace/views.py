@@ -2,16 +2,17 @@ from rest_framework import generics, permissions,status
 from .models import Workspace, WorkspaceMember,WorkspaceInvitation, CustomRole
 from rest_framework.response import Response
 from .serializers import WorkspaceSerializer, WorkspaceMemberSerializer, CustomRoleSerializer
-from adminpanel.models import Plan
+from adminpanel.catalog import plan_catalog
 from rest_framework import status
 from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from accounts.tasks import send_invitation_email
+from accounts.tasks import send_invitation_emails
 from django.shortcuts import get_object_or_404
 import stripe
 import uuid
-from project.permissions import HasWorkspacePermission
+from project.permissions import HasWorkspacePermission, resolve_permissions
+from .stripe_cache import stripe_cache
 
 # Create your views here.
 stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -34,11 +35,7 @@ class UserWorkspacesView(generics.ListAPIView):
         serializer = self.get_serializer(queryset, many=True)
         data = serializer.data
         for workspace in data:
-            try:
-                member = WorkspaceMember.objects.get(user=request.user, workspace_id=workspace["id"])
-                workspace["role"] = member.role
-            except WorkspaceMember.DoesNotExist:
-                workspace["role"] = None
+            workspace["role"], _ = resolve_permissions(request, workspace["id"])
 
         return Response(data, status=200)
     
@@ -66,9 +63,8 @@ class WorkspaceCreateView(generics.CreateAPIView):
         if not workspace_name or not plan_id:
             raise ValueError("Missing required fields")
 
-        try:
-            plan = Plan.objects.get(id=plan_id)
-        except Plan.DoesNotExist:
+        plan = plan_catalog.get_purchasable(plan_id)
+        if plan is None:
             raise ValueError("Invalid Plan ID")
 
         try:
@@ -78,7 +74,7 @@ class WorkspaceCreateView(generics.CreateAPIView):
                 customer_email=user.email,
                 line_items=[
                     {
-                        "price": plan.stripe_price_id,
+                        "price": plan["stripe_price_id"],
                         "quantity": 1,
                     }
                 ],
@@ -87,7 +83,7 @@ class WorkspaceCreateView(generics.CreateAPIView):
                 metadata={
                     "action": "create",
                     "user_id": user.id,
-                    "plan_id": plan.id,
+                    "plan_id": plan["id"],
                     "workspace_name": workspace_name,
                     "workspace_type": workspace_type,
                     "work_type": work_type,
@@ -133,28 +129,50 @@ class SendInvitesView(APIView):
         if workspace.owner != user:
             return Response({"error": "You are not authorized to invite members to this workspace"}, status=status.HTTP_403_FORBIDDEN)
         
+        # Last entry wins when the same email is listed twice.
+        requested = {}
         for invite in invites:
             email = invite.get("email")
-            full_name = invite.get("fullName")
             role = invite.get("role")
-            
-            if not email or not role:
-                continue
-
-            existing_member = WorkspaceMember.objects.filter(user__email=email, workspace=workspace).exists()
-            if existing_member:
-                continue
-
-            token = str(uuid.uuid4())
-            WorkspaceInvitation.objects.update_or_create(
-                email=email,
-                workspace=workspace,
-                defaults={"role": role, "token": token, "invited_by": user}
+            if email and role:
+                requested[email] = (invite.get("fullName"), role)
+
+        emails = list(requested)
+        members = set(
+            WorkspaceMember.objects.filter(workspace=workspace, user__email__in=emails)
+            .values_list("user__email", flat=True)
+        )
+        accepted = set(
+            WorkspaceInvitation.objects.filter(workspace=workspace, email__in=emails, accepted=True)
+            .values_list("email", flat=True)
+        )
+
+        invitations = [
+            WorkspaceInvitation(
+                email=email, workspace=workspace, role=role, token=uuid.uuid4(), invited_by=user,
             )
+            for email, (full_name, role) in requested.items()
+            if email not in members and email not in accepted
+        ]
+
+        WorkspaceInvitation.objects.bulk_create(
+            invitations,
+            update_conflicts=True,
+            unique_fields=["workspace", "email"],
+            update_fields=["role", "token", "invited_by"],
+        )
 
-            send_invitation_email.delay(email, full_name, role, workspace.name, token)
+        if invitations:
+            send_invitation_emails.delay(workspace.name, [
+                [invitation.email, requested[invitation.email][0], invitation.role, str(invitation.token)]
+                for invitation in invitations
+            ])
 
-        return Response({"message": "Invitations sent successfully!"}, status=status.HTTP_201_CREATED)
+        return Response({
+            "message": "Invitations sent successfully!",
+            "invited": len(invitations),
+            "skipped": len(requested) - len(invitations),
+        }, status=status.HTTP_201_CREATED)
 
 
 
@@ -223,9 +241,8 @@ class WorkspaceSubscriptionUpdateView(APIView):
             print("❌ Workspace not found or user not owner")
             return Response({"error": "Workspace not found or permission denied"}, status=404)
 
-        try:
-            plan = Plan.objects.get(id=plan_id)
-        except Plan.DoesNotExist:
+        plan = plan_catalog.get_purchasable(plan_id)
+        if plan is None:
             print("❌ Invalid plan ID")
             return Response({"error": "Invalid Plan ID"}, status=400)
 
@@ -237,7 +254,7 @@ class WorkspaceSubscriptionUpdateView(APIView):
                 customer_email=user.email,
                 line_items=[
                     {
-                        "price": plan.stripe_price_id,
+                        "price": plan["stripe_price_id"],
                         "quantity": 1,
                     }
                 ],
@@ -247,7 +264,7 @@ class WorkspaceSubscriptionUpdateView(APIView):
                     "action": "update",
                     "workspace_id": workspace.id,
                     "user_id": user.id,
-                    "plan_id": plan.id,
+                    "plan_id": plan["id"],
                 },
             )
 
@@ -269,29 +286,25 @@ class WorkspaceSubscriptionUpdateView(APIView):
 class StripeSubscriptionDetailView(APIView):
     def get(self, request, subscription_id):
         try:
-            subscription = stripe.Subscription.retrieve(subscription_id)
-
-            item = subscription["items"]["data"][0]
-            price = stripe.Price.retrieve(item["price"]["id"])
-            product = stripe.Product.retrieve(price["product"])
+            subscription, price, product = stripe_cache.subscription_detail(subscription_id)
 
             return Response({
-                "subscription_id": subscription.id,
-                "status": subscription.status,
-                "current_period_start": subscription.current_period_start,
-                "current_period_end": subscription.current_period_end,
-                "cancel_at_period_end": subscription.cancel_at_period_end,
+                "subscription_id": subscription["id"],
+                "status": subscription["status"],
+                "current_period_start": subscription["current_period_start"],
+                "current_period_end": subscription["current_period_end"],
+                "cancel_at_period_end": subscription["cancel_at_period_end"],
                 "price": {
-                    "id": price.id,
-                    "unit_amount": price.unit_amount,
-                    "interval": price.recurring["interval"],
-                    "interval_count": price.recurring["interval_count"],
-                    "currency": price.currency
+                    "id": price["id"],
+                    "unit_amount": price["unit_amount"],
+                    "interval": price["recurring"]["interval"],
+                    "interval_count": price["recurring"]["interval_count"],
+                    "currency": price["currency"]
                 },
                 "product": {
-                    "id": product.id,
-                    "name": product.name,
-                    "description": product.description
+                    "id": product["id"],
+                    "name": product["name"],
+                    "description": product["description"]
                 }
             })
 
@@ -310,11 +323,9 @@ class WorkspaceStatusView(APIView):
         try:
             workspace = Workspace.objects.get(id=workspace_id)
 
-            is_member = WorkspaceMember.objects.filter(
-                workspace=workspace, user=request.user
-            ).exists()
+            role, _ = resolve_permissions(request, workspace.id)
 
-            if not is_member:
+            if role is None:
                 return Response(
                     {"detail": "You do not have permission to access this workspace."},
                     status=status.HTTP_403_FORBIDDEN
@@ -347,10 +358,11 @@ class CancelSubscriptionView(APIView):
             if workspace.owner != request.user:
                 return Response({"error": "Unauthorized."}, status=status.HTTP_403_FORBIDDEN)
 
-            stripe.Subscription.modify(
+            subscription = stripe.Subscription.modify(
                 subscription_id,
                 cancel_at_period_end=True
             )
+            stripe_cache.store_subscription(subscription)
 
             return Response({"message": "Subscription will be canceled at period end."})
         except Exception as e: